@@ -0,0 +1,165 @@
+import io
+import os
+import json
+import wave
+import time
+
+import numpy as np
+
+# ============================================
+# CONFIGURAÇÕES
+# ============================================
+FRAME_MS = 20                 # janela usada na estimativa de SNR
+FULL_SCALE = 32768.0          # PCM 16 bits
+CLIP_LEVEL = 32767 * 0.999    # amostras acima disso contam como "estouradas"
+
+SILENCE_DBFS = -50.0          # abaixo disso não há fala para transcrever
+MAX_CLIPPING_RATIO = 0.05     # mais de 5% das amostras estouradas
+MIN_SNR_DB = 3.0              # fala praticamente no nível do ruído
+DC_OFFSET_LIMIT = 0.01        # 1% do fundo de escala
+TARGET_RMS_DBFS = -20.0       # nível desejado após normalização
+MAX_PEAK_DBFS = -1.0          # a normalização nunca passa deste pico
+
+STATS_FILE = os.path.join("logs", "qualidade_audio.jsonl")
+
+
+def _dbfs(value):
+    return float(20 * np.log10(max(value, 1e-10)))
+
+
+# ============================================
+# ANÁLISE
+# ============================================
+def analyze_pcm(samples, sample_rate):
+    """
+    Calcula nível, pico, saturação, DC e SNR de um vetor PCM 16 bits mono.
+    Retorna um dicionário com as estatísticas.
+    """
+    x = samples.astype(np.float32) / FULL_SCALE
+    n = x.size
+
+    dc_offset = float(x.mean()) if n else 0.0
+    centered = x - dc_offset
+    rms = float(np.sqrt(np.mean(centered * centered))) if n else 0.0
+    peak = float(np.abs(x).max()) if n else 0.0
+    clipping_ratio = float(np.count_nonzero(np.abs(samples.astype(np.int32)) >= CLIP_LEVEL) / n) if n else 0.0
+
+    # SNR estimado pela energia por janela: as janelas mais baixas são o ruído
+    # de fundo e as mais altas são a fala.
+    frame = max(1, sample_rate * FRAME_MS // 1000)
+    n_frames = n // frame
+    if n_frames >= 2:
+        frames = centered[:n_frames * frame].reshape(n_frames, frame)
+        frame_rms = np.sqrt(np.mean(frames * frames, axis=1))
+        noise, signal = np.percentile(frame_rms, [10, 90])
+        snr_db = _dbfs(signal) - _dbfs(noise)
+    else:
+        snr_db = 0.0
+
+    return {
+        "duracao": n / sample_rate if sample_rate else 0.0,
+        "rms_dbfs": _dbfs(rms),
+        "pico_dbfs": _dbfs(peak),
+        "saturacao": clipping_ratio,
+        "dc_offset": dc_offset,
+        "snr_db": snr_db,
+    }
+
+
+def check_quality(stats):
+    """Retorna a mensagem de erro se o áudio não tem salvação, ou None"""
+    if stats["rms_dbfs"] < SILENCE_DBFS:
+        return f"Áudio praticamente em silêncio ({stats['rms_dbfs']:.1f} dBFS)"
+    if stats["saturacao"] > MAX_CLIPPING_RATIO:
+        return f"Áudio muito distorcido ({stats['saturacao']:.1%} das amostras estouradas)"
+    if stats["snr_db"] < MIN_SNR_DB:
+        return f"Ruído muito alto (SNR {stats['snr_db']:.1f} dB)"
+    return None
+
+
+# ============================================
+# CORREÇÃO
+# ============================================
+def correct_pcm(samples, stats):
+    """Remove DC e ajusta o ganho em memória. Retorna (amostras, lista de correções)"""
+    corrections = []
+    x = samples.astype(np.float32)
+
+    if abs(stats["dc_offset"]) > DC_OFFSET_LIMIT:
+        x -= stats["dc_offset"] * FULL_SCALE
+        corrections.append("dc")
+
+    rms = np.sqrt(np.mean(x * x)) / FULL_SCALE if x.size else 0.0
+    peak = np.abs(x).max() / FULL_SCALE if x.size else 0.0
+    if rms > 0 and peak > 0:
+        gain = min(10 ** ((TARGET_RMS_DBFS - _dbfs(rms)) / 20),
+                   10 ** ((MAX_PEAK_DBFS - _dbfs(peak)) / 20))
+        # Só amplifica áudio baixo, e só se a diferença for perceptível (> ~1 dB)
+        if 20 * np.log10(gain) > 1.0:
+            x *= gain
+            corrections.append(f"ganho {20 * np.log10(gain):+.1f} dB")
+
+    if not corrections:
+        return samples, corrections
+    return np.clip(np.round(x), -32768, 32767).astype(np.int16), corrections
+
+
+def record_stats(audio_path, stats, corrections, error):
+    """Acrescenta as estatísticas em logs/qualidade_audio.jsonl para monitoramento"""
+    try:
+        os.makedirs(os.path.dirname(STATS_FILE), exist_ok=True)
+        entry = dict(stats, arquivo=os.path.basename(audio_path), correcoes=corrections,
+                     rejeitado=error, data=time.strftime("%Y-%m-%d %H:%M:%S"))
+        with open(STATS_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    except Exception as e:
+        print(f"⚠️ Erro ao registrar estatísticas: {e}")
+
+
+# ============================================
+# TRIAGEM
+# ============================================
+def prescreen_audio(audio_path):
+    """
+    Analisa o WAV antes do envio para a API.
+    Retorna: (bytes WAV prontos para envio ou None, estatísticas, mensagem de erro)
+    """
+    print("\n🔬 Analisando qualidade do áudio...")
+    with wave.open(audio_path, 'rb') as wf:
+        channels = wf.getnchannels()
+        sample_width = wf.getsampwidth()
+        framerate = wf.getframerate()
+        raw = wf.readframes(wf.getnframes())
+
+    if sample_width != 2:
+        return None, {}, f"Formato não suportado ({sample_width * 8} bits)"
+
+    samples = np.frombuffer(raw, dtype="<i2")
+    if channels > 1:
+        samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels)
+        samples = samples.mean(axis=1).astype(np.int16)
+
+    stats = analyze_pcm(samples, framerate)
+    print(f"📊 RMS: {stats['rms_dbfs']:.1f} dBFS | Pico: {stats['pico_dbfs']:.1f} dBFS")
+    print(f"📊 Saturação: {stats['saturacao']:.2%} | DC: {stats['dc_offset']:+.4f} | SNR: {stats['snr_db']:.1f} dB")
+
+    error = check_quality(stats)
+    if error:
+        print(f"❌ {error}")
+        record_stats(audio_path, stats, [], error)
+        return None, stats, error
+
+    samples, corrections = correct_pcm(samples, stats)
+    if corrections:
+        print(f"🔧 Correções aplicadas: {', '.join(corrections)}")
+    record_stats(audio_path, stats, corrections, None)
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(framerate)
+        out.writeframes(samples.astype("<i2").tobytes())
+
+    print("✅ Qualidade OK!")
+    return buffer.getvalue(), stats, None
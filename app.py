@@ -6,6 +6,11 @@ from firebase_admin import credentials, firestore
 from google.cloud.speech_v2 import SpeechClient
 from google.cloud.speech_v2.types import cloud_speech
 from google.api_core.client_options import ClientOptions
+from historico_conversas import append_segment
+from analise_audio import prescreen_audio
+from identificar_locutores import identify_speakers
+from arquivo_audios import archive_audio
+from exportar_transcricoes import words_from_alternative, new_session_id, save_session_words, index_session
 
 # ============================================
 # CONFIGURAÇÕES
@@ -24,6 +29,7 @@ FIREBASE_PROJECT_ID = "conectabd-b58eb"  # ← PROJETO FIREBASE
 COLLECTION_NAME = "textoTranscricao"
 DOCUMENT_ID = "653cgeO9NsObnNftR5vk"
 FIELD_NAME = "texto"
+CONVERSATION_ID = "1"  # documento em "conversas" lido pelo historico.js
 
 
 # ============================================
@@ -115,6 +121,10 @@ def validate_audio(audio_path):
                 print("⚠️ Sample rate baixo")
                 return False, "Qualidade muito baixa"
             
+            if sample_width != 2:
+                print("⚠️ Não é PCM 16 bits")
+                return False, f"Áudio com {sample_width * 8} bits (esperado 16)"
+            
             print("✅ Áudio válido!")
             return True, None
     
@@ -126,25 +136,27 @@ def validate_audio(audio_path):
 # ============================================
 # TRANSCRIÇÃO
 # ============================================
-def transcribe_with_diarization(audio_file_path):
-    """Transcreve áudio com diarização e retorna o texto"""
-    
-    print("\n" + "="*60)
-    print("🎙️ INICIANDO TRANSCRIÇÃO")
-    print("="*60)
-    print(f"📁 Arquivo: {audio_file_path}")
-    
+def discard_converted(converted_path, original_path):
+    """Apaga o _converted.wav temporário (nunca o arquivo original)"""
+    if converted_path != original_path and os.path.exists(converted_path):
+        os.remove(converted_path)
+
+
+def prepare_audio(audio_file_path):
+    """Valida o WAV e converte com ffmpeg se necessário. Retorna (caminho, erro)"""
     # Valida áudio
     is_valid, error_msg = validate_audio(audio_file_path)
     
     if not is_valid:
         print(f"⚠️ Convertendo: {error_msg}")
+        original_path = audio_file_path
         
         converted_path = audio_file_path.replace(".wav", "_converted.wav")
         success, conv_error = convert_to_wav(audio_file_path, converted_path)
         
         if not success:
             print(f"❌ Falha: {conv_error}")
+            discard_converted(converted_path, audio_file_path)
             return None, f'Formato inválido. {conv_error}'
         
         audio_file_path = converted_path
@@ -152,15 +164,53 @@ def transcribe_with_diarization(audio_file_path):
         
         is_valid, error_msg = validate_audio(audio_file_path)
         if not is_valid:
+            # Quem chamou não recebe o caminho, então o temporário é apagado aqui
+            discard_converted(converted_path, original_path)
             return None, f'Inválido após conversão: {error_msg}'
     
+    return audio_file_path, None
+
+
+def transcribe_with_diarization(audio_file_path):
+    """Transcreve áudio com diarização e retorna o texto"""
+    
+    print("\n" + "="*60)
+    print("🎙️ INICIANDO TRANSCRIÇÃO")
+    print("="*60)
+    print(f"📁 Arquivo: {audio_file_path}")
+    
+    original_path = audio_file_path
+    audio_file_path, error = prepare_audio(audio_file_path)
+    if error:
+        return None, error
+    
+    try:
+        # Triagem de qualidade (rejeita áudio sem salvação, corrige DC/ganho em memória)
+        audio_content, audio_stats, quality_error = prescreen_audio(audio_file_path)
+        if quality_error:
+            return None, f'Áudio rejeitado: {quality_error}'
+        
+        # Guarda uma cópia única (FLAC) da gravação, identificada pelo hash.
+        # Só depois da triagem, para não arquivar silêncio ou áudio inutilizável.
+        audio_hash = None
+        try:
+            audio_hash = archive_audio(audio_file_path, source_path=original_path)
+        except Exception as e:
+            print(f"⚠️ Erro ao arquivar áudio: {e}")
+        
+        return recognize_audio(audio_content, original_path, audio_hash)
+    finally:
+        # O _converted.wav é temporário: a cópia que fica é a do arquivo
+        discard_converted(audio_file_path, original_path)
+
+
+def recognize_audio(audio_content, audio_file_path, audio_hash=None):
+    """Envia o áudio já preparado para a Speech API e monta o texto por locutor"""
+    
     # Conecta à API
     client_options = ClientOptions(api_endpoint=f"{REGION}-speech.googleapis.com")
     client = SpeechClient(client_options=client_options)
     
-    with open(audio_file_path, "rb") as audio_file:
-        audio_content = audio_file.read()
-    
     print(f"📊 Tamanho: {len(audio_content)} bytes")
     
     # Configuração com diarização
@@ -225,6 +275,20 @@ def transcribe_with_diarization(audio_file_path):
             error_msg = 'Sem fala detectada no áudio.'
             return None, error_msg
     
+    # Coleta as palavras (tempos/locutor) e dá nomes estáveis aos locutores
+    session_words = []
+    for result in response.results:
+        session_words.extend(words_from_alternative(result.alternatives[0]))
+    
+    speaker_names = {}
+    try:
+        speaker_names = identify_speakers(audio_content, session_words)
+    except Exception as e:
+        print(f"⚠️ Erro ao identificar locutores: {e}")
+    for word in session_words:
+        if word["speaker"] in speaker_names:
+            word["locutor"] = speaker_names[word["speaker"]]
+    
     # Processa resultados
     transcription_text = ""
     
@@ -235,7 +299,6 @@ def transcribe_with_diarization(audio_file_path):
         print(f"💬 Texto: {alternative.transcript}")
         print(f"📊 Confiança: {round(alternative.confidence * 100, 2)}%")
         
-        
         has_speaker_info = hasattr(alternative.words[0], 'speaker_label') if alternative.words else False
         
         if has_speaker_info:
@@ -250,7 +313,8 @@ def transcribe_with_diarization(audio_file_path):
                 
                 if current_speaker != speaker:
                     if current_speaker is not None and current_text:
-                        transcription_text += f"[Locutor {current_speaker}]: {' '.join(current_text)}\n\n"
+                        label = speaker_names.get(current_speaker, f"Locutor {current_speaker}")
+                        transcription_text += f"[{label}]: {' '.join(current_text)}\n\n"
                     
                     current_speaker = speaker
                     current_text = [word]
@@ -258,11 +322,22 @@ def transcribe_with_diarization(audio_file_path):
                     current_text.append(word)
             
             if current_speaker is not None and current_text:
-                transcription_text += f"[Locutor {current_speaker}]: {' '.join(current_text)}\n\n"
+                label = speaker_names.get(current_speaker, f"Locutor {current_speaker}")
+                transcription_text += f"[{label}]: {' '.join(current_text)}\n\n"
         else:
             print("📝 Sem diarização...")
             transcription_text += f"[Transcrição]: {alternative.transcript}\n\n"
     
+    # Guarda as palavras com tempos/locutor para legendas e busca
+    # (falhas aqui não podem derrubar uma transcrição já paga e concluída)
+    if session_words:
+        try:
+            session_id = new_session_id(audio_file_path)
+            save_session_words(session_id, audio_file_path, session_words, audio_hash)
+            index_session(session_id)
+        except Exception as e:
+            print(f"⚠️ Erro ao salvar palavras/índice da sessão: {e}")
+    
     print("\n" + "="*60)
     print("✅ TRANSCRIÇÃO CONCLUÍDA!")
     print("="*60 + "\n")
@@ -348,6 +423,13 @@ def main():
     # Salva no Firebase
     success = save_to_firebase(db, transcription_text)
     
+    # Acrescenta ao histórico paginado (sem reescrever o histórico inteiro)
+    try:
+        append_segment(db, CONVERSATION_ID, transcription_text)
+        print("✅ Trecho adicionado ao histórico!")
+    except Exception as e:
+        print(f"⚠️ Erro ao atualizar histórico: {e}")
+    
     if success:
         print("\n" + "🎉"*30)
         print("PROCESSO CONCLUÍDO COM SUCESSO!")
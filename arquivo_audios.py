@@ -0,0 +1,256 @@
+import os
+import sys
+import json
+import time
+import wave
+import hashlib
+import tempfile
+import threading
+import subprocess
+
+from trava_arquivo import file_lock
+
+# ============================================
+# CONFIGURAÇÕES
+# ============================================
+# Cada gravação única vira um FLAC em arquivo/<2 primeiros chars do hash>/<hash>.flac.
+# O hash é do PCM normalizado (16 kHz, mono, 16 bits), então o mesmo áudio salvo
+# em formatos/arquivos diferentes ocupa espaço uma vez só.
+ARCHIVE_FOLDER = "arquivo"
+CATALOG_FILE = os.path.join(ARCHIVE_FOLDER, "catalogo.json")
+CATALOG_LOCK_FILE = CATALOG_FILE + ".lock"
+AUDIO_FOLDER = "audios"
+SAMPLE_RATE = 16000
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a", ".flac", ".ogg", ".webm")
+TEMP_MIN_AGE_SECONDS = 3600   # _converted.wav mais novo que isso pode estar em uso
+
+_catalog_lock = threading.Lock()
+
+
+# ============================================
+# PCM NORMALIZADO + HASH
+# ============================================
+def read_normalized_pcm(audio_path):
+    """Retorna o áudio como PCM 16 kHz mono 16 bits (lê direto se o WAV já estiver assim)"""
+    try:
+        with wave.open(audio_path, 'rb') as wf:
+            if wf.getframerate() == SAMPLE_RATE and wf.getnchannels() == 1 and wf.getsampwidth() == 2:
+                return wf.readframes(wf.getnframes())
+    except (wave.Error, EOFError):
+        pass
+
+    command = [
+        'ffmpeg', '-v', 'error',
+        '-i', audio_path,
+        '-f', 's16le', '-acodec', 'pcm_s16le',
+        '-ar', str(SAMPLE_RATE), '-ac', '1',
+        '-',
+    ]
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"FFmpeg erro: {result.stderr.decode(errors='replace')[:200]}")
+    return result.stdout
+
+
+def audio_hash(pcm):
+    return hashlib.sha256(pcm).hexdigest()
+
+
+def archive_path(digest):
+    return os.path.join(ARCHIVE_FOLDER, digest[:2], f"{digest}.flac")
+
+
+# ============================================
+# CATÁLOGO
+# ============================================
+def load_catalog():
+    if not os.path.exists(CATALOG_FILE):
+        return {}
+    with open(CATALOG_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_catalog(catalog):
+    os.makedirs(ARCHIVE_FOLDER, exist_ok=True)
+    fd, tmp_file = tempfile.mkstemp(dir=ARCHIVE_FOLDER, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(catalog, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, CATALOG_FILE)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+
+# ============================================
+# ARQUIVAR / RESTAURAR
+# ============================================
+def encode_flac(pcm, output_path):
+    """Comprime o PCM em FLAC (sem perdas) usando ffmpeg"""
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    # Temporário com nome único: duas threads/processos arquivando o mesmo áudio
+    # ao mesmo tempo não escrevem no mesmo arquivo, e o os.replace final é atômico
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(output_path), suffix=".flac")
+    os.close(fd)
+    command = [
+        'ffmpeg', '-v', 'error', '-y',
+        '-f', 's16le', '-ar', str(SAMPLE_RATE), '-ac', '1', '-i', '-',
+        '-c:a', 'flac', '-compression_level', '8',
+        tmp_path,
+    ]
+    try:
+        result = subprocess.run(command, input=pcm, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            raise RuntimeError(f"FFmpeg erro: {result.stderr.decode(errors='replace')[:200]}")
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def archive_audio(audio_path, source_path=None):
+    """
+    Guarda uma cópia FLAC do áudio se ela ainda não existir.
+    Retorna o hash que identifica a gravação (usado para ligar transcrições ao áudio).
+    """
+    pcm = read_normalized_pcm(audio_path)
+    digest = audio_hash(pcm)
+    flac_path = archive_path(digest)
+    source = os.path.abspath(source_path or audio_path)
+
+    if not os.path.exists(flac_path):
+        encode_flac(pcm, flac_path)
+        print(f"🗄️ Áudio arquivado: {digest[:12]}… ({len(pcm)} → {os.path.getsize(flac_path)} bytes)")
+    else:
+        print(f"🗄️ Áudio já arquivado: {digest[:12]}…")
+
+    # Ler-alterar-gravar travado entre threads e processos, senão um sobrescreve
+    # as entradas que o outro acabou de acrescentar
+    with _catalog_lock, file_lock(CATALOG_LOCK_FILE):
+        catalog = load_catalog()
+        entry = catalog.setdefault(digest, {
+            "arquivo": os.path.relpath(flac_path, ARCHIVE_FOLDER),
+            "duracao": len(pcm) / (SAMPLE_RATE * 2),
+            "bytes_pcm": len(pcm),
+            "bytes_flac": os.path.getsize(flac_path),
+            "criadoEm": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "origens": [],
+        })
+        if source not in entry["origens"]:
+            entry["origens"].append(source)
+        save_catalog(catalog)
+
+    return digest
+
+
+def is_archived(audio_path):
+    """True se o áudio já tem cópia FLAC no arquivo (então o WAV pode ser apagado)"""
+    return os.path.exists(archive_path(audio_hash(read_normalized_pcm(audio_path))))
+
+
+def restore_audio(digest, output_path):
+    """Recria um WAV 16 kHz mono a partir do FLAC arquivado, para reprocessar a sessão"""
+    flac_path = archive_path(digest)
+    if not os.path.exists(flac_path):
+        raise FileNotFoundError(f"Áudio {digest} não está no arquivo")
+
+    command = [
+        'ffmpeg', '-v', 'error', '-y',
+        '-i', flac_path,
+        '-acodec', 'pcm_s16le', '-ar', str(SAMPLE_RATE), '-ac', '1',
+        output_path,
+    ]
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"FFmpeg erro: {result.stderr.decode(errors='replace')[:200]}")
+    return output_path
+
+
+def is_normalized_wav(audio_path):
+    """True se o arquivo já é WAV 16 kHz mono 16 bits, ou seja, o FLAC guarda o áudio inteiro"""
+    try:
+        with wave.open(audio_path, 'rb') as wf:
+            return wf.getframerate() == SAMPLE_RATE and wf.getnchannels() == 1 and wf.getsampwidth() == 2
+    except (wave.Error, EOFError):
+        return False
+
+
+def verify_archive(digest):
+    """Decodifica o FLAC arquivado e confere se o PCM bate com o hash"""
+    fd, tmp_path = tempfile.mkstemp(suffix=".wav")
+    os.close(fd)
+    try:
+        restore_audio(digest, tmp_path)
+        return audio_hash(read_normalized_pcm(tmp_path)) == digest
+    finally:
+        os.remove(tmp_path)
+
+
+def remove_temp_artifacts(folder=AUDIO_FOLDER):
+    """
+    Apaga os _converted.wav que sobraram de execuções interrompidas.
+    Os recentes ficam: app.py/pipeline podem estar usando e apagam sozinhos no fim.
+    """
+    removed = 0
+    now = time.time()
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        if not name.lower().endswith("_converted.wav"):
+            continue
+        try:
+            if now - os.path.getmtime(path) < TEMP_MIN_AGE_SECONDS:
+                continue
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass  # o dono terminou e apagou enquanto listávamos
+    return removed
+
+
+def main(args):
+    if len(args) == 3 and args[0] == "--restaurar":
+        print(f"✅ Restaurado: {restore_audio(args[1], args[2])}")
+        return
+
+    # Sem argumentos: arquiva tudo o que está em audios/ e limpa os temporários
+    remove_original = "--remover-originais" in args
+    total_before = 0
+    for name in sorted(os.listdir(AUDIO_FOLDER)):
+        path = os.path.join(AUDIO_FOLDER, name)
+        if not name.lower().endswith(AUDIO_EXTENSIONS) or name.lower().endswith("_converted.wav"):
+            continue
+        try:
+            digest = archive_audio(path)
+        except Exception as e:
+            print(f"❌ {name}: {e}")
+            continue
+        total_before += os.path.getsize(path)
+        if not remove_original:
+            continue
+
+        # O arquivo guarda só a versão 16 kHz mono: outros formatos perderiam qualidade
+        if not is_normalized_wav(path):
+            print(f"⏭️ {name}: mantido (não é WAV 16 kHz mono 16 bits)")
+            continue
+        try:
+            verified = verify_archive(digest)
+        except Exception as e:
+            print(f"❌ {name}: mantido, erro ao conferir o arquivo: {e}")
+            continue
+        if not verified:
+            print(f"❌ {name}: mantido, o FLAC arquivado não confere com o original")
+            continue
+        os.remove(path)
+        print(f"🗑️ {name}: original removido")
+
+    removed = remove_temp_artifacts()
+    catalog = load_catalog()
+    total_after = sum(entry["bytes_flac"] for entry in catalog.values())
+    print(f"\n🧹 {removed} arquivo(s) temporário(s) removido(s)")
+    print(f"📦 {len(catalog)} gravação(ões) única(s): {total_before} bytes em {AUDIO_FOLDER} → {total_after} bytes no arquivo")
+
+
+if __name__ == "__main__":
+    # python arquivo_audios.py [--remover-originais]   (só remove WAVs 16 kHz mono já conferidos)
+    # python arquivo_audios.py --restaurar <hash> <saida.wav>
+    main(sys.argv[1:])
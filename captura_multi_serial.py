@@ -0,0 +1,310 @@
+# captura_multi_serial.py
+import os
+import sys
+import time
+import queue
+import threading
+import functools
+from datetime import datetime
+
+import serial
+from serial.tools import list_ports
+
+from gravar_serial_wav import BAUDRATE, SAMPLE_RATE, SAMPLE_WIDTH, READ_CHUNK, save_wav
+
+# ======= CONFIGURAÇÕES (EDITE AQUI) =======
+OUTPUT_FOLDER = "audios"
+SEGMENT_SECONDS = 10       # duração de cada trecho enviado para transcrição
+QUEUE_MAX_CHUNKS = 256     # limite de blocos pendentes por dispositivo
+MAX_PENDING_SEGMENTS = 6   # trechos esperando transcrição (~1 min); acima disso descarta os mais antigos
+SHUTDOWN_TIMEOUT = 30      # segundos para terminar a transcrição em andamento ao encerrar
+RECONNECT_DELAY = 2        # segundos antes de tentar reabrir a porta
+MAX_RECONNECT_DELAY = 30
+# Trechos da descrição/fabricante dos conversores USB-serial usados nos ESP32
+PORT_HINTS = ("CP210", "CH340", "CH910", "USB Serial", "USB-SERIAL", "ESP32")
+# ===========================================
+
+
+def discover_ports():
+    """Lista as portas seriais que parecem ser placas ESP32"""
+    ports = []
+    for info in list_ports.comports():
+        description = f"{info.description} {info.manufacturer or ''}"
+        if any(hint.lower() in description.lower() for hint in PORT_HINTS):
+            ports.append(info.device)
+    return ports
+
+
+def device_id_for(port):
+    """Gera um identificador legível para a porta (COM5 -> COM5, /dev/ttyUSB0 -> ttyUSB0)"""
+    return os.path.basename(port)
+
+
+# ============================================
+# DISPOSITIVO
+# ============================================
+class SerialDevice:
+    """Captura de uma porta serial: threads de leitura, de segmentação e de transcrição"""
+
+    def __init__(self, port, on_segment, session_id=None):
+        self.port = port
+        self.device_id = device_id_for(port)
+        self.session_id = session_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.on_segment = on_segment
+
+        # Fila limitada: se o consumidor atrasar, descartamos os blocos mais
+        # antigos deste dispositivo sem travar a leitura dos outros.
+        self.chunks = queue.Queue(maxsize=QUEUE_MAX_CHUNKS)
+        # Trechos já gravados em disco esperando transcrição. A transcrição roda
+        # em outra thread para que uma chamada lenta não esvazie a fila de áudio.
+        # Também é limitada: se a API for mais lenta que o tempo real, os trechos
+        # mais antigos são descartados em vez de o atraso crescer sem fim.
+        self.pending_segments = queue.Queue(maxsize=MAX_PENDING_SEGMENTS)
+        self.stop_event = threading.Event()
+        self.dropped_chunks = 0
+        self.dropped_segments = 0
+        self.segments = 0
+        self.errors = 0
+        self.connected = False
+
+        self._reader = threading.Thread(target=self._read_loop, name=f"leitor-{self.device_id}", daemon=True)
+        self._writer = threading.Thread(target=self._segment_loop, name=f"segmentos-{self.device_id}", daemon=True)
+        self._transcriber = threading.Thread(target=self._transcribe_loop, name=f"transcricao-{self.device_id}", daemon=True)
+
+    def log(self, message):
+        print(f"[{self.device_id}] {message}")
+
+    def start(self):
+        self._reader.start()
+        self._writer.start()
+        self._transcriber.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def join(self, timeout=None):
+        self._reader.join(timeout)
+        self._writer.join(timeout)
+        # Os trechos já gravados ainda são transcritos, mas sem prender o encerramento
+        self._transcriber.join(SHUTDOWN_TIMEOUT)
+        if self._transcriber.is_alive():
+            self.log(f"⚠️ Encerrando com {self.pending_segments.qsize()} trecho(s) sem transcrever")
+
+    def _put_chunk(self, data):
+        while True:
+            try:
+                self.chunks.put_nowait(data)
+                return
+            except queue.Full:
+                try:
+                    self.chunks.get_nowait()
+                    self.dropped_chunks += 1
+                except queue.Empty:
+                    pass
+
+    def _read_loop(self):
+        delay = RECONNECT_DELAY
+        while not self.stop_event.is_set():
+            try:
+                ser = serial.Serial(self.port, BAUDRATE, timeout=1)
+            except Exception as e:
+                self.errors += 1
+                self.log(f"⚠️ Erro ao abrir porta serial: {e} (nova tentativa em {delay}s)")
+                self.stop_event.wait(delay)
+                delay = min(delay * 2, MAX_RECONNECT_DELAY)
+                continue
+
+            self.log(f"✅ Conectado @ {BAUDRATE} baud")
+            self.connected = True
+            delay = RECONNECT_DELAY
+            try:
+                # Dar tempo para o ESP32 inicializar
+                time.sleep(2)
+                ser.reset_input_buffer()
+                while not self.stop_event.is_set():
+                    data = ser.read(READ_CHUNK)
+                    if data:
+                        self._put_chunk(bytes(data))
+            except Exception as e:
+                # Placa desconectada: registra e tenta de novo, sem afetar os outros dispositivos
+                self.errors += 1
+                self.log(f"⚠️ Leitura interrompida: {e}")
+            finally:
+                self.connected = False
+                ser.close()
+
+    def _segment_loop(self):
+        segment_bytes = SEGMENT_SECONDS * SAMPLE_RATE * SAMPLE_WIDTH
+        frames = bytearray()
+        while not self.stop_event.is_set() or not self.chunks.empty():
+            try:
+                frames.extend(self.chunks.get(timeout=0.5))
+            except queue.Empty:
+                continue
+            if len(frames) >= segment_bytes:
+                self._flush(frames[:segment_bytes])
+                del frames[:segment_bytes]
+        if len(frames) >= SAMPLE_RATE * SAMPLE_WIDTH // 2:
+            self._flush(frames)
+        self.pending_segments.put(None)  # avisa a thread de transcrição que acabou
+
+    def _flush(self, frames):
+        self.segments += 1
+        filename = f"{self.device_id}_{self.session_id}_{self.segments:04d}.wav"
+        path = os.path.join(OUTPUT_FOLDER, filename)
+        try:
+            save_wav(frames, path)
+        except Exception as e:
+            self.errors += 1
+            self.log(f"❌ Falha ao salvar {filename}: {e}")
+            return
+        while True:
+            try:
+                self.pending_segments.put_nowait(path)
+                return
+            except queue.Full:
+                self._drop_oldest_segment()
+
+    def _drop_oldest_segment(self):
+        try:
+            dropped = self.pending_segments.get_nowait()
+        except queue.Empty:
+            return
+        self.dropped_segments += 1
+        self.log(f"⚠️ Transcrição atrasada, descartando {os.path.basename(dropped)}")
+        try:
+            os.remove(dropped)
+        except OSError as e:
+            self.log(f"⚠️ Erro ao apagar {os.path.basename(dropped)}: {e}")
+
+    def _transcribe_loop(self):
+        while True:
+            path = self.pending_segments.get()
+            if path is None:
+                break
+            try:
+                self.on_segment(self.device_id, self.session_id, path)
+            except Exception as e:
+                self.errors += 1
+                self.log(f"❌ Falha ao transcrever {os.path.basename(path)}: {e}")
+
+    def stats(self):
+        return {
+            "device_id": self.device_id,
+            "port": self.port,
+            "session_id": self.session_id,
+            "connected": self.connected,
+            "segments": self.segments,
+            "pending_chunks": self.chunks.qsize(),
+            "pending_segments": self.pending_segments.qsize(),
+            "dropped_chunks": self.dropped_chunks,
+            "dropped_segments": self.dropped_segments,
+            "errors": self.errors,
+        }
+
+
+# ============================================
+# HUB
+# ============================================
+class CaptureHub:
+    """Gerencia várias placas ao mesmo tempo, cada uma com suas próprias threads"""
+
+    def __init__(self, on_segment, session_id=None):
+        self.on_segment = on_segment
+        self.session_id = session_id
+        self.devices = {}
+        self.lock = threading.Lock()
+
+    def add_port(self, port):
+        with self.lock:
+            device_id = device_id_for(port)
+            if device_id in self.devices:
+                return self.devices[device_id]
+            device = SerialDevice(port, self.on_segment, self.session_id)
+            self.devices[device_id] = device
+        device.start()
+        return device
+
+    def rescan(self):
+        """Procura placas novas e começa a capturar as que ainda não estão no hub"""
+        for port in discover_ports():
+            if device_id_for(port) not in self.devices:
+                print(f"🔌 Nova placa encontrada: {port}")
+                self.add_port(port)
+
+    def stop(self):
+        for device in self.devices.values():
+            device.stop()
+        for device in self.devices.values():
+            device.join(timeout=5)
+
+    def stats(self):
+        return [device.stats() for device in self.devices.values()]
+
+
+def transcribe_segment(device_id, session_id, path, db=None):
+    """Envia o trecho gravado para a transcrição e guarda no histórico com dispositivo e sessão"""
+    from app import transcribe_with_diarization, CONVERSATION_ID
+    from historico_conversas import append_segment
+
+    text, error = None, None
+    try:
+        text, error = transcribe_with_diarization(path)
+        if error:
+            print(f"[{device_id}] ❌ Erro na transcrição ({session_id}): {error}")
+            return
+        print(f"[{device_id}] 📄 {session_id}:\n{text}")
+        if db is not None:
+            append_segment(db, CONVERSATION_ID, text, device_id=device_id)
+    finally:
+        remove_segment(device_id, path, rejected=bool(error and error.startswith("Áudio rejeitado")))
+
+
+def remove_segment(device_id, path, rejected=False):
+    """
+    Apaga o WAV do trecho depois da transcrição: o áudio fica só no arquivo FLAC
+    (sem perdas, o trecho já é 16 kHz mono). Trechos rejeitados na triagem
+    (silêncio, ruído) também saem; os demais ficam em disco para nova tentativa.
+    """
+    from arquivo_audios import is_archived
+
+    try:
+        if rejected or is_archived(path):
+            os.remove(path)
+    except Exception as e:
+        print(f"[{device_id}] ⚠️ Erro ao apagar {os.path.basename(path)}: {e}")
+
+
+def main(ports):
+    from app import initialize_firebase
+
+    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+    hub = CaptureHub(functools.partial(transcribe_segment, db=initialize_firebase()))
+
+    for port in ports:
+        hub.add_port(port)
+    if not ports:
+        hub.rescan()
+        if not hub.devices:
+            print("Nenhuma placa encontrada ainda, aguardando conexões...")
+
+    try:
+        while True:
+            time.sleep(RECONNECT_DELAY * 5)
+            if not ports:
+                hub.rescan()
+            for s in hub.stats():
+                status = "🟢" if s["connected"] else "🔴"
+                print(f"{status} {s['device_id']}: {s['segments']} trecho(s) | "
+                      f"fila {s['pending_chunks']} | aguardando transcrição {s['pending_segments']} | "
+                      f"descartados {s['dropped_chunks']} bloco(s)/{s['dropped_segments']} trecho(s) | "
+                      f"erros {s['errors']}")
+    except KeyboardInterrupt:
+        print("Captura interrompida.")
+    finally:
+        hub.stop()
+
+
+if __name__ == "__main__":
+    # python captura_multi_serial.py COM3 COM5   (sem argumentos: detecta as placas sozinho)
+    main(sys.argv[1:])
@@ -0,0 +1,326 @@
+import os
+import re
+import sys
+import json
+import tempfile
+import unicodedata
+from datetime import datetime
+
+from trava_arquivo import file_lock
+
+# ============================================
+# CONFIGURAÇÕES
+# ============================================
+TRANSCRIPTS_FOLDER = "transcricoes"
+# Índice: indice.json (consolidado) + indice/<sessão>.json (uma por transcrição nova).
+# Cada transcrição só grava o próprio arquivo; a consolidação junta tudo de vez em quando.
+INDEX_FILE = os.path.join(TRANSCRIPTS_FOLDER, "indice.json")
+POSTINGS_FOLDER = os.path.join(TRANSCRIPTS_FOLDER, "indice")
+INDEX_LOCK_FILE = INDEX_FILE + ".lock"
+MAX_PENDING_POSTINGS = 200   # sessões soltas antes de consolidar no indice.json
+MAX_CAPTION_CHARS = 84       # ~2 linhas de 42 caracteres
+MAX_CAPTION_SECONDS = 6.0
+MAX_GAP_SECONDS = 1.0        # pausa maior que isso inicia uma nova legenda
+
+
+# ============================================
+# PALAVRAS DA TRANSCRIÇÃO
+# ============================================
+def words_from_alternative(alternative):
+    """Extrai (palavra, início, fim, locutor) de uma alternativa da Speech API v2"""
+    words = []
+    for word_info in alternative.words:
+        words.append({
+            "word": word_info.word,
+            # timedelta(0) é falso, mas é o início válido da primeira palavra
+            "start": word_info.start_offset.total_seconds(),
+            "end": word_info.end_offset.total_seconds(),
+            "speaker": getattr(word_info, 'speaker_label', None) or None,
+        })
+    return words
+
+
+def new_session_id(audio_path):
+    """Nome do arquivo + data/hora, para cada transcrição virar uma sessão nova no índice"""
+    name = os.path.splitext(os.path.basename(audio_path))[0]
+    return f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+
+
+def session_path(session_id):
+    return os.path.join(TRANSCRIPTS_FOLDER, f"{session_id}.json")
+
+
+def save_session_words(session_id, audio_path, words, audio_hash=None):
+    """Guarda as palavras de uma sessão em transcricoes/<sessão>.json"""
+    os.makedirs(TRANSCRIPTS_FOLDER, exist_ok=True)
+    # "audio_hash" aponta para a cópia em arquivo/ (ver arquivo_audios.restore_audio)
+    data = {"session_id": session_id, "audio": audio_path, "audio_hash": audio_hash, "words": words}
+    with open(session_path(session_id), "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def load_session(session_id):
+    with open(session_path(session_id), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def list_sessions():
+    if not os.path.isdir(TRANSCRIPTS_FOLDER):
+        return []
+    return sorted(
+        name[:-len(".json")] for name in os.listdir(TRANSCRIPTS_FOLDER)
+        if name.endswith(".json") and os.path.join(TRANSCRIPTS_FOLDER, name) != INDEX_FILE
+    )
+
+
+# ============================================
+# LEGENDAS (SRT / WebVTT)
+# ============================================
+def speaker_label(word):
+    """Nome estável do locutor (se identificado) ou o rótulo da diarização"""
+    if word.get("locutor"):
+        return word["locutor"]
+    if word["speaker"]:
+        return f"Locutor {word['speaker']}"
+    return None
+
+
+def build_captions(words):
+    """Agrupa as palavras em legendas respeitando troca de locutor, pausas e tamanho"""
+    captions = []
+    current = None
+
+    for w in words:
+        if w["start"] is None or w["end"] is None:
+            continue
+        if current is not None:
+            text_len = len(current["text"]) + 1 + len(w["word"])
+            new_caption = (
+                w["speaker"] != current["speaker"]
+                or w["start"] - current["end"] > MAX_GAP_SECONDS
+                or text_len > MAX_CAPTION_CHARS
+                or w["end"] - current["start"] > MAX_CAPTION_SECONDS
+            )
+            if not new_caption:
+                current["text"] += " " + w["word"]
+                current["end"] = w["end"]
+                continue
+            captions.append(current)
+        current = {"speaker": w["speaker"], "label": speaker_label(w),
+                   "start": w["start"], "end": w["end"], "text": w["word"]}
+
+    if current is not None:
+        captions.append(current)
+    return captions
+
+
+def format_timestamp(seconds, separator):
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
+
+
+def caption_text(caption):
+    if caption["label"]:
+        return f"[{caption['label']}]: {caption['text']}"
+    return caption["text"]
+
+
+def to_srt(words):
+    blocks = []
+    for i, caption in enumerate(build_captions(words), start=1):
+        start = format_timestamp(caption["start"], ",")
+        end = format_timestamp(caption["end"], ",")
+        blocks.append(f"{i}\n{start} --> {end}\n{caption_text(caption)}\n")
+    return "\n".join(blocks)
+
+
+def to_vtt(words):
+    blocks = ["WEBVTT\n"]
+    for caption in build_captions(words):
+        start = format_timestamp(caption["start"], ".")
+        end = format_timestamp(caption["end"], ".")
+        text = caption["text"]
+        if caption["label"]:
+            text = f"<v {caption['label']}>{text}"
+        blocks.append(f"{start} --> {end}\n{text}\n")
+    return "\n".join(blocks)
+
+
+def export_subtitles(session_id):
+    """Gera <sessão>.srt e <sessão>.vtt ao lado do JSON da sessão"""
+    words = load_session(session_id)["words"]
+    base = os.path.join(TRANSCRIPTS_FOLDER, session_id)
+    with open(base + ".srt", "w", encoding="utf-8") as f:
+        f.write(to_srt(words))
+    with open(base + ".vtt", "w", encoding="utf-8") as f:
+        f.write(to_vtt(words))
+    return base + ".srt", base + ".vtt"
+
+
+# ============================================
+# ÍNDICE INVERTIDO (palavra -> sessão, tempo)
+# ============================================
+def normalize_term(word):
+    """Minúsculas, sem acento e sem pontuação, para a busca achar 'Você' com 'voce'"""
+    word = unicodedata.normalize("NFKD", word.lower())
+    word = "".join(ch for ch in word if not unicodedata.combining(ch))
+    return re.sub(r"[^\w]", "", word, flags=re.UNICODE)
+
+
+def build_index(session_ids=None):
+    """Monta {termo: [[sessão, início], ...]} com as ocorrências ordenadas"""
+    index = {}
+    for session_id in session_ids if session_ids is not None else list_sessions():
+        for w in load_session(session_id)["words"]:
+            term = normalize_term(w["word"])
+            if term:
+                index.setdefault(term, []).append([session_id, w["start"] or 0.0])
+    for postings in index.values():
+        postings.sort()
+    return index
+
+
+def _write_json(path, data):
+    # grava em arquivo temporário único e troca, para uma leitura nunca pegar o arquivo pela metade
+    fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_file, path)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+
+def postings_path(session_id):
+    return os.path.join(POSTINGS_FOLDER, f"{session_id}.json")
+
+
+def _pending_sessions():
+    if not os.path.isdir(POSTINGS_FOLDER):
+        return []
+    return sorted(name[:-len(".json")] for name in os.listdir(POSTINGS_FOLDER) if name.endswith(".json"))
+
+
+def save_index(index, session_ids):
+    """Grava o índice consolidado com a lista das sessões que ele já contém"""
+    os.makedirs(TRANSCRIPTS_FOLDER, exist_ok=True)
+    _write_json(INDEX_FILE, {"sessoes": sorted(session_ids), "termos": index})
+
+
+def _load_consolidated():
+    if not os.path.exists(INDEX_FILE):
+        return {}, set()
+    with open(INDEX_FILE, encoding="utf-8") as f:
+        data = json.load(f)
+    if "termos" not in data:
+        # formato antigo (só os termos): rode "python exportar_transcricoes.py" para reconstruir
+        print("⚠️ Índice em formato antigo, ignorado até ser reconstruído")
+        return {}, set()
+    return data["termos"], set(data["sessoes"])
+
+
+def _merge_pending(index, sessions):
+    """Junta ao índice as sessões ainda em indice/<sessão>.json. Retorna as que entraram"""
+    merged = []
+    for session_id in _pending_sessions():
+        if session_id in sessions:
+            continue  # já consolidada por uma reconstrução completa
+        try:
+            with open(postings_path(session_id), encoding="utf-8") as f:
+                postings = json.load(f)
+        except FileNotFoundError:
+            continue  # outra consolidação acabou de apagar
+        for term, entries in postings.items():
+            index.setdefault(term, []).extend(entries)
+        merged.append(session_id)
+    for postings in index.values():
+        postings.sort()
+    return merged
+
+
+def load_index():
+    """Índice consolidado + sessões ainda não consolidadas: {termo: [[sessão, início], ...]}"""
+    index, sessions = _load_consolidated()
+    _merge_pending(index, sessions)
+    return index
+
+
+def compact_index():
+    """Consolida as sessões soltas no indice.json e apaga os arquivos delas"""
+    with file_lock(INDEX_LOCK_FILE):
+        index, sessions = _load_consolidated()
+        merged = _merge_pending(index, sessions)
+        save_index(index, sessions.union(merged))
+        for session_id in set(_pending_sessions()) & sessions.union(merged):
+            os.remove(postings_path(session_id))
+    return len(merged)
+
+
+def rebuild_index():
+    """Reconstrói o índice inteiro a partir das sessões salvas"""
+    with file_lock(INDEX_LOCK_FILE):
+        sessions = list_sessions()
+        save_index(build_index(sessions), sessions)
+        for session_id in set(_pending_sessions()) & set(sessions):
+            os.remove(postings_path(session_id))
+    return sessions
+
+
+def index_session(session_id):
+    """
+    Adiciona uma sessão recém-transcrita ao índice. Só grava indice/<sessão>.json
+    (o custo não cresce com o acervo); a cada MAX_PENDING_POSTINGS sessões consolida.
+    """
+    os.makedirs(POSTINGS_FOLDER, exist_ok=True)
+    # Os IDs de sessão são únicos, então não há ocorrências antigas para remover
+    _write_json(postings_path(session_id), build_index([session_id]))
+    if len(_pending_sessions()) >= MAX_PENDING_POSTINGS:
+        print(f"📚 Consolidando {compact_index()} sessão(ões) no índice")
+
+
+def search(index, query):
+    """
+    Busca as sessões que contêm todos os termos da consulta.
+    Retorna: {sessão: [tempos em que o primeiro termo aparece]}
+    """
+    terms = [normalize_term(t) for t in query.split()]
+    terms = [t for t in terms if t]
+    if not terms:
+        return {}
+
+    matches = None
+    for term in terms:
+        sessions = {session for session, _ in index.get(term, [])}
+        matches = sessions if matches is None else matches & sessions
+        if not matches:
+            return {}
+
+    results = {}
+    for session, start in index.get(terms[0], []):
+        if session in matches:
+            results.setdefault(session, []).append(start)
+    return results
+
+
+if __name__ == "__main__":
+    # python exportar_transcricoes.py            -> gera legendas e reconstrói o índice
+    # python exportar_transcricoes.py "bom dia"   -> busca no índice
+    if len(sys.argv) > 1:
+        index = load_index()
+        found = search(index, " ".join(sys.argv[1:]))
+        if not found:
+            print("🔍 Nenhuma ocorrência encontrada")
+        for session, starts in found.items():
+            tempos = ", ".join(f"{s:.2f}s" for s in starts)
+            print(f"📄 {session}: {tempos}")
+    else:
+        sessions = list_sessions()
+        for session_id in sessions:
+            srt, vtt = export_subtitles(session_id)
+            print(f"✅ {session_id}: {os.path.basename(srt)}, {os.path.basename(vtt)}")
+        sessions = rebuild_index()
+        print(f"📚 Índice salvo em {INDEX_FILE} ({len(sessions)} sessão(ões))")
@@ -16,6 +16,21 @@ OUTPUT_FILE = "audios\\gravacao.wav"
 READ_CHUNK = 1024
 # ===========================================
 
+def save_wav(frames, output_file):
+    """Grava os bytes PCM recebidos da serial em um arquivo WAV"""
+    # Ajuste -- garantir múltiplo de SAMPLE_WIDTH
+    if len(frames) % SAMPLE_WIDTH != 0:
+        cut = len(frames) % SAMPLE_WIDTH
+        print(f"Ajustando {cut} byte(s) finais para alinhar com {SAMPLE_WIDTH} bytes/amostra.")
+        frames = frames[:len(frames) - cut]
+
+    # Salvar WAV
+    with wave.open(output_file, "wb") as wf:
+        wf.setnchannels(CHANNELS)
+        wf.setsampwidth(SAMPLE_WIDTH)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes(frames)
+
 def main(port):
     print(f"Conectando a: {port} @ {BAUDRATE} baud")
     try:
@@ -41,18 +56,7 @@ def main(port):
     finally:
         ser.close()
 
-    # Ajuste -- garantir múltiplo de SAMPLE_WIDTH
-    if len(frames) % SAMPLE_WIDTH != 0:
-        cut = len(frames) % SAMPLE_WIDTH
-        print(f"Ajustando {cut} byte(s) finais para alinhar com {SAMPLE_WIDTH} bytes/amostra.")
-        frames = frames[:len(frames) - cut]
-
-    # Salvar WAV
-    with wave.open(OUTPUT_FILE, "wb") as wf:
-        wf.setnchannels(CHANNELS)
-        wf.setsampwidth(SAMPLE_WIDTH)
-        wf.setframerate(SAMPLE_RATE)
-        wf.writeframes(frames)
+    save_wav(frames, OUTPUT_FILE)
 
     filesize = os.path.getsize(OUTPUT_FILE)
     duration_calc = filesize / (SAMPLE_WIDTH * SAMPLE_RATE)
@@ -14,12 +14,60 @@ import FontAwesome6 from "@expo/vector-icons/FontAwesome6";
 import Feather from "@expo/vector-icons/Feather";
 import MaterialIcons from "@expo/vector-icons/MaterialIcons";
 import { db } from "./firebaseConfig";
-import { doc, getDoc } from "firebase/firestore";
+import {
+  doc,
+  getDoc,
+  collection,
+  query,
+  where,
+  orderBy,
+  limit,
+  startAfter,
+  getDocs,
+} from "firebase/firestore";
+
+// Mesma leitura de historico_conversas.get_history_page: o cursor é um seq e
+// cada chamada traz trechos mais antigos que ele, primeiro os abertos
+// (conversas/1/segmentos) e depois as páginas arquivadas (conversas/1/paginas).
+const TRECHOS_POR_PAGINA = 50;
+
+const carregarPaginaHistorico = async (cursor) => {
+  const conversaRef = doc(db, "conversas", "1");
+
+  const filtrosAbertos = [orderBy("seq", "desc")];
+  if (cursor !== null) filtrosAbertos.push(startAfter(cursor));
+  const abertos = await getDocs(
+    query(collection(conversaRef, "segmentos"), ...filtrosAbertos, limit(TRECHOS_POR_PAGINA))
+  );
+  if (!abertos.empty) {
+    const trechos = abertos.docs.map((d) => d.data());
+    return { trechos, proximoCursor: trechos[trechos.length - 1].seq };
+  }
+
+  const filtrosPaginas = [orderBy("primeiroSeq", "desc")];
+  if (cursor !== null) filtrosPaginas.unshift(where("primeiroSeq", "<", cursor));
+  const paginas = await getDocs(
+    query(collection(conversaRef, "paginas"), ...filtrosPaginas, limit(1))
+  );
+  if (paginas.empty) return { trechos: [], proximoCursor: null };
+
+  const pagina = paginas.docs[0].data();
+  const trechos = [...pagina.segmentos]
+    .reverse()
+    .filter((t) => cursor === null || t.seq < cursor);
+  return {
+    trechos,
+    proximoCursor: pagina.primeiroSeq > 1 ? pagina.primeiroSeq : null,
+  };
+};
 
 export default function Historico({ navigation }) {
   const [conteudo, setConteudo] = useState("");
   const [atualizadoEm, setAtualizadoEm] = useState("");
   const [loading, setLoading] = useState(true);
+  const [transcricoes, setTranscricoes] = useState([]);
+  const [cursor, setCursor] = useState(null);
+  const [carregandoMais, setCarregandoMais] = useState(false);
 
   const Voltar = () => navigation.goBack();
 
@@ -45,6 +93,10 @@ export default function Historico({ navigation }) {
         } else {
           console.log("Documento não encontrado!");
         }
+
+        const pagina = await carregarPaginaHistorico(null);
+        setTranscricoes(pagina.trechos);
+        setCursor(pagina.proximoCursor);
       } catch (error) {
         console.error("Erro ao buscar dados:", error);
       } finally {
@@ -55,6 +107,20 @@ export default function Historico({ navigation }) {
     fetchData();
   }, []);
 
+  const carregarMais = async () => {
+    if (cursor === null || carregandoMais) return;
+    setCarregandoMais(true);
+    try {
+      const pagina = await carregarPaginaHistorico(cursor);
+      setTranscricoes((anteriores) => [...anteriores, ...pagina.trechos]);
+      setCursor(pagina.proximoCursor);
+    } catch (error) {
+      console.error("Erro ao carregar histórico:", error);
+    } finally {
+      setCarregandoMais(false);
+    }
+  };
+
   if (!fontsLoaded || loading) {
     return (
       <View style={styles.loadingContainer}>
@@ -107,6 +173,24 @@ export default function Historico({ navigation }) {
           </View>
 
           <View style={styles.linha} />
+
+          {/* Transcrições dos áudios (histórico paginado do Firestore) */}
+          {transcricoes.map((trecho) => (
+            <View style={styles.item} key={trecho.seq}>
+              <Feather name="mic" size={35} color="#fff" />
+              <Text style={styles.itemTexto}>{trecho.texto}</Text>
+            </View>
+          ))}
+
+          {cursor !== null && (
+            <TouchableOpacity style={styles.botaoMais} onPress={carregarMais}>
+              {carregandoMais ? (
+                <ActivityIndicator color="#01283C" />
+              ) : (
+                <Text style={styles.botaoMaisTexto}>Carregar mais</Text>
+              )}
+            </TouchableOpacity>
+          )}
         </ScrollView>
       </View>
 
@@ -193,6 +277,20 @@ const styles = StyleSheet.create({
     marginBottom: 50,
   },
 
+  botaoMais: {
+    backgroundColor: "#FFBE1D",
+    borderRadius: 15,
+    paddingVertical: 15,
+    alignItems: "center",
+    width: "60%",
+    alignSelf: "center",
+  },
+  botaoMaisTexto: {
+    color: "#01283C",
+    fontFamily: "textos",
+    fontSize: 24,
+  },
+
   // ======== Rodapé fixo ========
   rodapeContainer: {
     paddingVertical: 15,
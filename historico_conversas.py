@@ -0,0 +1,200 @@
+from firebase_admin import firestore
+
+# ============================================
+# CONFIGURAÇÕES
+# ============================================
+# Estrutura no Firestore:
+#   conversas/{id}                  -> do app (teclado.js grava "conteudo" sem merge): não mexemos
+#   conversas/{id}/meta/estado      -> contadores, escritos só por este módulo
+#   conversas/{id}/segmentos/{seq}  -> trechos recentes, ainda não compactados
+#   conversas/{id}/paginas/{num}    -> páginas arquivadas (imutáveis) com resumo
+CONVERSATIONS_COLLECTION = "conversas"
+META_COLLECTION = "meta"
+STATE_DOCUMENT = "estado"
+SEGMENTS_COLLECTION = "segmentos"
+PAGES_COLLECTION = "paginas"
+SEGMENTS_PER_PAGE = 50            # máximo de trechos por página (< 500 operações por batch)
+MAX_PAGE_BYTES = 512 * 1024       # bem abaixo do limite de 1 MiB por documento
+PREVIEW_CHARS = 120
+
+
+def _segment_id(seq):
+    return f"{seq:08d}"
+
+
+def _page_id(number):
+    return f"{number:06d}"
+
+
+def _conversation_ref(db, conversation_id):
+    return db.collection(CONVERSATIONS_COLLECTION).document(str(conversation_id))
+
+
+def _state_ref(conversation_ref):
+    return conversation_ref.collection(META_COLLECTION).document(STATE_DOCUMENT)
+
+
+# ============================================
+# ESCRITA
+# ============================================
+def append_segment(db, conversation_id, text, device_id=None):
+    """Adiciona um trecho novo à conversa sem reescrever o que já foi salvo"""
+    conversation_ref = _conversation_ref(db, conversation_id)
+    state_ref = _state_ref(conversation_ref)
+    transaction = db.transaction()
+
+    @firestore.transactional
+    def _append(transaction):
+        snapshot = state_ref.get(transaction=transaction)
+        data = (snapshot.to_dict() or {}) if snapshot.exists else {}
+        seq = data.get("totalSegmentos", 0) + 1
+        open_segments = data.get("segmentosAbertos", 0) + 1
+
+        segment = {"seq": seq, "texto": text, "criadoEm": firestore.SERVER_TIMESTAMP}
+        if device_id:
+            segment["dispositivo"] = device_id
+        # create (e não set): se o contador voltar atrás, a transação falha em vez
+        # de sobrescrever um trecho já salvo
+        transaction.create(conversation_ref.collection(SEGMENTS_COLLECTION).document(_segment_id(seq)), segment)
+        transaction.set(state_ref, {
+            "totalSegmentos": seq,
+            "segmentosAbertos": open_segments,
+            "atualizadoEm": firestore.SERVER_TIMESTAMP,
+        }, merge=True)
+        return seq, open_segments
+
+    seq, open_segments = _append(transaction)
+
+    if open_segments >= SEGMENTS_PER_PAGE:
+        try:
+            # only_if_full: se outra gravação já compactou, esta não faz nada
+            compact(db, conversation_id, only_if_full=True)
+        except Exception as e:
+            # O trecho já está salvo; a próxima gravação tenta compactar de novo
+            print(f"⚠️ Compactação adiada: {e}")
+    return seq
+
+
+def _page_summary(segments):
+    texts = [s.get("texto", "") for s in segments]
+    devices = sorted({s["dispositivo"] for s in segments if s.get("dispositivo")})
+    return {
+        "quantidade": len(segments),
+        "caracteres": sum(len(t) for t in texts),
+        "inicio": segments[0].get("criadoEm"),
+        "fim": segments[-1].get("criadoEm"),
+        "dispositivos": devices,
+        "previa": texts[0][:PREVIEW_CHARS] if texts else "",
+    }
+
+
+def compact(db, conversation_id, only_if_full=False):
+    """
+    Move os trechos mais antigos para uma página arquivada.
+    Retorna o número da página criada ou None se não havia o que compactar.
+    """
+    conversation_ref = _conversation_ref(db, conversation_id)
+    state_ref = _state_ref(conversation_ref)
+    segments_ref = conversation_ref.collection(SEGMENTS_COLLECTION)
+    transaction = db.transaction()
+
+    # Consulta, numeração e escrita na mesma transação: duas compactações ao
+    # mesmo tempo não arquivam os mesmos trechos nem descontam o contador duas vezes.
+    @firestore.transactional
+    def _compact(transaction):
+        data = state_ref.get(transaction=transaction).to_dict() or {}
+        open_segments = data.get("segmentosAbertos", 0)
+        if only_if_full and open_segments < SEGMENTS_PER_PAGE:
+            return None, 0
+
+        query = segments_ref.order_by("seq").limit(SEGMENTS_PER_PAGE)
+        docs = list(query.stream(transaction=transaction))
+        if not docs:
+            return None, 0
+
+        # Corta a página antes de passar do limite de tamanho do documento
+        selected = []
+        size = 0
+        for doc in docs:
+            segment = doc.to_dict()
+            size += len(segment.get("texto", "").encode("utf-8")) + 64
+            if selected and size > MAX_PAGE_BYTES:
+                break
+            selected.append((doc, segment))
+
+        segments = [segment for _, segment in selected]
+        number = data.get("totalPaginas", 0) + 1
+
+        transaction.create(conversation_ref.collection(PAGES_COLLECTION).document(_page_id(number)), {
+            "numero": number,
+            "primeiroSeq": segments[0]["seq"],
+            "ultimoSeq": segments[-1]["seq"],
+            "resumo": _page_summary(segments),
+            "segmentos": segments,
+        })
+        for doc, _ in selected:
+            transaction.delete(doc.reference)
+        transaction.set(state_ref, {
+            "totalPaginas": number,
+            "segmentosAbertos": max(open_segments - len(selected), 0),
+        }, merge=True)
+        return number, len(selected)
+
+    number, archived = _compact(transaction)
+    if number is not None:
+        print(f"🗜️ Conversa {conversation_id}: {archived} trecho(s) arquivados na página {number}")
+    return number
+
+
+# ============================================
+# LEITURA PAGINADA
+# ============================================
+def get_history_page(db, conversation_id, cursor=None):
+    """
+    Lê uma página do histórico, da mais recente para a mais antiga.
+    O cursor é um seq: cada chamada devolve trechos com seq menor que ele. Primeiro
+    percorre os trechos ainda abertos (SEGMENTS_PER_PAGE por vez, mesmo que a
+    compactação esteja atrasada) e depois as páginas arquivadas.
+    Retorna: {"segmentos": [...], "resumo": {...} ou None, "proximoCursor": int ou None}
+    """
+    conversation_ref = _conversation_ref(db, conversation_id)
+
+    query = conversation_ref.collection(SEGMENTS_COLLECTION) \
+        .order_by("seq", direction=firestore.Query.DESCENDING)
+    if cursor is not None:
+        query = query.start_after({"seq": cursor})
+    segments = [doc.to_dict() for doc in query.limit(SEGMENTS_PER_PAGE).stream()]
+    if segments:
+        return {"segmentos": segments, "resumo": None, "proximoCursor": segments[-1]["seq"]}
+
+    # Sem trechos abertos antes do cursor: segue para a página arquivada que os contém.
+    # Filtra por primeiroSeq porque uma compactação entre duas leituras pode ter
+    # arquivado trechos dos dois lados do cursor na mesma página.
+    query = conversation_ref.collection(PAGES_COLLECTION) \
+        .order_by("primeiroSeq", direction=firestore.Query.DESCENDING)
+    if cursor is not None:
+        query = query.where("primeiroSeq", "<", cursor)
+    docs = list(query.limit(1).stream())
+    if not docs:
+        return {"segmentos": [], "resumo": None, "proximoCursor": None}
+
+    page = docs[0].to_dict()
+    segments = [s for s in reversed(page["segmentos"]) if cursor is None or s["seq"] < cursor]
+    return {
+        "segmentos": segments,
+        "resumo": page["resumo"],
+        "proximoCursor": page["primeiroSeq"] if page["primeiroSeq"] > 1 else None,
+    }
+
+
+def list_page_summaries(db, conversation_id, cursor=None, limit=20):
+    """Lista só os resumos das páginas arquivadas (sem baixar os trechos)"""
+    query = _conversation_ref(db, conversation_id).collection(PAGES_COLLECTION) \
+        .order_by("numero", direction=firestore.Query.DESCENDING)
+    if cursor is not None:
+        query = query.start_after({"numero": cursor})
+    docs = list(query.select(["numero", "resumo"]).limit(limit).stream())
+
+    summaries = [doc.to_dict() for doc in docs]
+    next_cursor = summaries[-1]["numero"] if len(summaries) == limit else None
+    return {"paginas": summaries, "proximoCursor": next_cursor}
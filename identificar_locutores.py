@@ -0,0 +1,365 @@
+import io
+import os
+import sys
+import json
+import wave
+import threading
+import contextlib
+from collections import defaultdict
+
+import numpy as np
+
+from trava_arquivo import file_lock
+
+# ============================================
+# CONFIGURAÇÕES
+# ============================================
+SPEAKERS_FOLDER = "locutores"
+EMBEDDINGS_FILE = os.path.join(SPEAKERS_FOLDER, "embeddings.npy")
+SPEAKERS_FILE = os.path.join(SPEAKERS_FOLDER, "locutores.json")
+
+FRAME_MS = 25
+HOP_MS = 10
+N_FFT = 512
+N_MELS = 40
+N_MFCC = 13
+PITCH_FRAME_MS = 40           # janela da autocorrelação (cobre 2 períodos a 60 Hz)
+F0_MIN = 60.0
+F0_MAX = 400.0
+PITCH_BINS = 48               # histograma log-f0: ~1 semitom por faixa
+PITCH_SMOOTHING = 1.5         # desvio (em faixas) da suavização do histograma
+PITCH_WEIGHT = 0.7            # peso do tom de voz na similaridade; o resto é timbre (MFCC)
+EMBEDDING_DIM = PITCH_BINS + N_MFCC - 1
+MIN_TURN_SECONDS = 1.0        # turnos mais curtos não dão uma assinatura confiável
+
+# Calibrado com os dois locutores de audios/audio1.wav (~105 Hz e ~260 Hz) e com
+# as vozes sintéticas do teste_carga.py (110–220 Hz), em trechos de 3 s:
+# mesmo locutor >= 0.70 (0.95 em trechos de 6 s), locutores diferentes <= 0.61.
+MATCH_THRESHOLD = 0.75        # similaridade mínima para reconhecer alguém
+UPDATE_THRESHOLD = 0.85       # só atualiza o centroide com correspondências seguras
+MIN_MARGIN = 0.10             # diferença mínima para o segundo mais parecido
+
+
+# ============================================
+# ASSINATURA DE VOZ (CPU, só NumPy)
+# ============================================
+def _mel_filterbank(sample_rate):
+    def hz_to_mel(hz):
+        return 2595 * np.log10(1 + hz / 700)
+
+    def mel_to_hz(mel):
+        return 700 * (10 ** (mel / 2595) - 1)
+
+    mels = np.linspace(hz_to_mel(0), hz_to_mel(sample_rate / 2), N_MELS + 2)
+    bins = np.floor((N_FFT + 1) * mel_to_hz(mels) / sample_rate).astype(int)
+    bank = np.zeros((N_MELS, N_FFT // 2 + 1), dtype=np.float32)
+    for m in range(1, N_MELS + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        if center > left:
+            bank[m - 1, left:center] = (np.arange(left, center) - left) / (center - left)
+        if right > center:
+            bank[m - 1, center:right] = (right - np.arange(center, right)) / (right - center)
+    return bank
+
+
+def _dct_matrix():
+    n = np.arange(N_MELS)
+    k = np.arange(N_MFCC)[:, None]
+    return np.cos(np.pi * k * (2 * n + 1) / (2 * N_MELS)).astype(np.float32)
+
+
+_FILTERBANKS = {}
+_DCT = _dct_matrix()
+
+
+def _frames(x, frame, hop):
+    n_frames = 1 + (len(x) - frame) // hop
+    idx = np.arange(frame)[None, :] + hop * np.arange(n_frames)[:, None]
+    return x[idx]
+
+
+def _pitch_histogram(x, sample_rate):
+    """Distribuição do tom de voz (f0 por autocorrelação) nas janelas vozeadas"""
+    frame = sample_rate * PITCH_FRAME_MS // 1000
+    hop = sample_rate * HOP_MS // 1000
+    frames = _frames(x, frame, hop)
+    frames = frames - frames.mean(axis=1, keepdims=True)
+    energy = (frames * frames).mean(axis=1)
+
+    spectrum = np.fft.rfft(frames * np.hanning(frame), n=2 * frame)
+    autocorr = np.fft.irfft(np.abs(spectrum) ** 2)[:, :frame]
+    autocorr /= np.maximum(autocorr[:, :1], 1e-12)
+
+    low, high = int(sample_rate / F0_MAX), min(int(sample_rate / F0_MIN), frame - 1)
+    lag = low + np.argmax(autocorr[:, low:high], axis=1)
+    peak = autocorr[np.arange(len(lag)), lag]
+    voiced = (peak > 0.45) & (energy > np.percentile(energy, 30))
+    if voiced.sum() < 10:
+        return None
+
+    f0 = sample_rate / lag[voiced]
+    bins = (np.log2(f0 / F0_MIN) / np.log2(F0_MAX / F0_MIN) * PITCH_BINS).astype(int)
+    histogram = np.bincount(np.clip(bins, 0, PITCH_BINS - 1), minlength=PITCH_BINS).astype(np.float32)
+    kernel = np.exp(-0.5 * (np.arange(-4, 5) / PITCH_SMOOTHING) ** 2)
+    histogram = np.convolve(histogram, kernel, mode="same")
+    return histogram / np.linalg.norm(histogram)
+
+
+def _mfcc_mean(x, sample_rate):
+    """Timbre médio: MFCCs c1..c12 das janelas com energia (sem o c0, que é só volume)"""
+    frame = sample_rate * FRAME_MS // 1000
+    hop = sample_rate * HOP_MS // 1000
+    emphasized = np.append(x[0], x[1:] - 0.97 * x[:-1])  # pré-ênfase
+    frames = _frames(emphasized, frame, hop) * np.hamming(frame).astype(np.float32)
+
+    if sample_rate not in _FILTERBANKS:
+        _FILTERBANKS[sample_rate] = _mel_filterbank(sample_rate)
+    power = np.abs(np.fft.rfft(frames, n=N_FFT)) ** 2
+    log_mel = np.log(power @ _FILTERBANKS[sample_rate].T + 1e-10)
+    mfcc = log_mel @ _DCT.T
+
+    energy = log_mel.mean(axis=1)
+    features = mfcc[energy > np.percentile(energy, 30)][:, 1:].mean(axis=0)
+    return features / np.linalg.norm(features)
+
+
+def compute_embedding(samples, sample_rate):
+    """
+    Assinatura compacta de voz: histograma do tom de voz + timbre médio (MFCC).
+    Cada bloco é normalizado e pesado, então o produto escalar de duas assinaturas
+    é PITCH_WEIGHT * sim(tom) + (1 - PITCH_WEIGHT) * sim(timbre).
+    Retorna um vetor normalizado ou None se o trecho for curto ou sem voz.
+    """
+    if len(samples) < int(MIN_TURN_SECONDS * sample_rate):
+        return None
+
+    x = samples.astype(np.float32) / 32768.0
+    pitch = _pitch_histogram(x, sample_rate)
+    if pitch is None:
+        return None
+    timbre = _mfcc_mean(x, sample_rate)
+    return np.concatenate([np.sqrt(PITCH_WEIGHT) * pitch,
+                           np.sqrt(1 - PITCH_WEIGHT) * timbre]).astype(np.float32)
+
+
+# ============================================
+# CADASTRO PERSISTENTE DE LOCUTORES
+# ============================================
+class SpeakerStore:
+    """
+    Locutores conhecidos: uma matriz N x D de assinaturas (centroides) em disco.
+    A busca do vizinho mais próximo é um único produto matriz-vetor.
+    """
+
+    def __init__(self, folder=SPEAKERS_FOLDER):
+        self.embeddings_file = os.path.join(folder, os.path.basename(EMBEDDINGS_FILE))
+        self.speakers_file = os.path.join(folder, os.path.basename(SPEAKERS_FILE))
+        self.lock_file = self.speakers_file + ".lock"
+        self.lock = threading.Lock()
+        self.speakers = []
+        self.matrix = None
+        self.load()
+
+    @contextlib.contextmanager
+    def locked(self):
+        """
+        Trava o cadastro entre threads e processos (app.py e a captura podem rodar
+        juntos) e relê do disco, para não cadastrar duas pessoas com o mesmo nome
+        nem apagar cadastros feitos pelo outro processo.
+        """
+        with self.lock, file_lock(self.lock_file):
+            self.load()
+            yield
+
+    def load(self):
+        self.speakers = []
+        self.matrix = None
+        if os.path.exists(self.speakers_file) and os.path.exists(self.embeddings_file):
+            matrix = np.load(self.embeddings_file)
+            if matrix.ndim != 2 or matrix.shape[1] != EMBEDDING_DIM:
+                # Cadastro de uma versão antiga da assinatura: não dá para comparar
+                print(f"⚠️ Cadastro de locutores incompatível ({self.embeddings_file}), começando do zero")
+                return
+            with open(self.speakers_file, encoding="utf-8") as f:
+                self.speakers = json.load(f)
+            self.matrix = matrix
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.speakers_file), exist_ok=True)
+        # grava em arquivo temporário e troca, para não corromper o cadastro
+        tmp_embeddings = self.embeddings_file + ".tmp.npy"
+        np.save(tmp_embeddings, self.matrix)
+        os.replace(tmp_embeddings, self.embeddings_file)
+        tmp_speakers = self.speakers_file + ".tmp"
+        with open(tmp_speakers, "w", encoding="utf-8") as f:
+            json.dump(self.speakers, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_speakers, self.speakers_file)
+
+    def nearest(self, embedding, exclude=()):
+        """
+        Retorna (índice, similaridade, similaridade do segundo mais parecido).
+        Sem candidatos: (None, 0.0, 0.0).
+        """
+        if self.matrix is None or len(self.matrix) <= len(exclude):
+            return None, 0.0, 0.0
+        scores = self.matrix @ embedding
+        scores[list(exclude)] = -np.inf
+        best = int(np.argmax(scores))
+        best_score = float(scores[best])
+        scores[best] = -np.inf
+        second = float(scores.max()) if len(scores) > 1 else 0.0
+        return best, best_score, max(second, 0.0)
+
+    def enroll(self, embedding, name=None):
+        index = len(self.speakers)
+        self.speakers.append({"nome": name or f"Pessoa {index + 1}", "amostras": 1})
+        row = embedding[None, :]
+        self.matrix = row if self.matrix is None else np.vstack([self.matrix, row])
+        return index
+
+    def update(self, index, embedding):
+        """Atualiza o centroide com a nova amostra (média acumulada)"""
+        count = self.speakers[index]["amostras"]
+        centroid = self.matrix[index] * count + embedding
+        self.matrix[index] = centroid / np.linalg.norm(centroid)
+        self.speakers[index]["amostras"] = count + 1
+
+    def rename(self, old_name, new_name):
+        with self.locked():
+            for speaker in self.speakers:
+                if speaker["nome"] == old_name:
+                    speaker["nome"] = new_name
+                    self.save()
+                    return True
+        return False
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SpeakerStore()
+    return _store
+
+
+# ============================================
+# IDENTIFICAÇÃO DOS TURNOS
+# ============================================
+def _split_turns(words):
+    """Agrupa as palavras em turnos contínuos do mesmo rótulo de diarização"""
+    turns = []
+    for w in words:
+        if not w.get("speaker") or w.get("start") is None or w.get("end") is None:
+            continue
+        if turns and turns[-1]["speaker"] == w["speaker"]:
+            turns[-1]["end"] = w["end"]
+        else:
+            turns.append({"speaker": w["speaker"], "start": w["start"], "end": w["end"]})
+    return turns
+
+
+def identify_speakers(wav_bytes, words, store=None):
+    """
+    Troca os rótulos arbitrários da diarização por nomes estáveis entre sessões.
+    Retorna: {rótulo da API: nome do locutor}
+    """
+    store = store or get_store()
+    turns = _split_turns(words)
+    if not turns:
+        return {}
+
+    with wave.open(io.BytesIO(wav_bytes), 'rb') as wf:
+        sample_rate = wf.getframerate()
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype="<i2")
+
+    # Uma assinatura por turno
+    embeddings = defaultdict(list)
+    for turn in turns:
+        segment = samples[int(turn["start"] * sample_rate):int(turn["end"] * sample_rate)]
+        embedding = compute_embedding(segment, sample_rate)
+        if embedding is not None:
+            embeddings[turn["speaker"]].append(embedding)
+
+    mapping = {}
+    used = set()  # na mesma sessão, rótulos diferentes são pessoas diferentes
+    with store.locked():
+        for label, turn_embeddings in embeddings.items():
+            # Compara a média dos turnos do rótulo, que é mais estável que um turno só
+            centroid = np.mean(turn_embeddings, axis=0)
+            centroid /= np.linalg.norm(centroid)
+            index, score, second = store.nearest(centroid, exclude=used)
+
+            if index is None or score < MATCH_THRESHOLD:
+                index = store.enroll(centroid)
+                print(f"🆕 Novo locutor cadastrado: {store.speakers[index]['nome']}")
+            elif score - second < MIN_MARGIN:
+                # Parecido com mais de um cadastrado: melhor manter o rótulo da API
+                # do que chamar a pessoa pelo nome de outra
+                print(f"⚠️ Locutor {label} ambíguo ({score:.2f} vs {second:.2f}), mantendo rótulo")
+                continue
+            elif score >= UPDATE_THRESHOLD:
+                store.update(index, centroid)
+            used.add(index)
+            mapping[label] = store.speakers[index]["nome"]
+
+        if mapping:
+            store.save()
+
+    for label, name in mapping.items():
+        print(f"🗣️ Locutor {label} → {name}")
+    return mapping
+
+
+# ============================================
+# VERIFICAÇÃO DA SEPARAÇÃO
+# ============================================
+def synthetic_speech(seconds, seed, f0=None, sample_rate=16000):
+    """
+    Gera um sinal parecido com fala: vogais com harmônicos, sílabas e pausas.
+    f0=None sorteia o tom entre 110 e 220 Hz (usado também pelo teste_carga.py).
+    """
+    rng = np.random.default_rng(seed)
+    if f0 is None:
+        f0 = rng.uniform(110, 220)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pitch = f0 * (1 + 0.05 * np.sin(2 * np.pi * 0.5 * t))
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+    syllables = np.clip(np.sin(2 * np.pi * rng.uniform(3, 5) * t), 0, None)
+    pauses = (np.sin(2 * np.pi * 0.3 * t + rng.uniform(0, np.pi)) > -0.6).astype(float)
+    signal = 0.25 * voice * syllables * pauses + 0.005 * rng.standard_normal(t.size)
+    return np.clip(signal * 32767, -32768, 32767).astype("<i2")
+
+
+def check_separation():
+    """
+    Confere que vozes diferentes ficam abaixo de MATCH_THRESHOLD e que duas
+    gravações da mesma voz ficam acima. Retorna True se tudo passou.
+    """
+    pitches = [110, 130, 150, 170, 190, 220]
+    first = [compute_embedding(synthetic_speech(4, i, f0), 16000) for i, f0 in enumerate(pitches)]
+    second = [compute_embedding(synthetic_speech(4, i + 10, f0), 16000) for i, f0 in enumerate(pitches)]
+
+    ok = True
+    for i in range(len(pitches)):
+        same = float(first[i] @ second[i])
+        if same < MATCH_THRESHOLD:
+            print(f"❌ Mesma voz ({pitches[i]} Hz) abaixo do limite: {same:.2f}")
+            ok = False
+        for j in range(i + 1, len(pitches)):
+            other = float(first[i] @ first[j])
+            if other >= MATCH_THRESHOLD:
+                print(f"❌ Vozes {pitches[i]} Hz e {pitches[j]} Hz confundidas: {other:.2f}")
+                ok = False
+    if ok:
+        print(f"✅ Vozes distintas abaixo de {MATCH_THRESHOLD} e mesma voz acima")
+    return ok
+
+
+if __name__ == "__main__":
+    # python identificar_locutores.py  -> verifica se a assinatura separa vozes diferentes
+    sys.exit(0 if check_separation() else 1)
@@ -0,0 +1,268 @@
+import os
+import sys
+import time
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from analise_audio import prescreen_audio
+from arquivo_audios import archive_audio
+
+# ============================================
+# CONFIGURAÇÕES
+# ============================================
+AUDIO_FOLDER = "audios"
+QUEUE_SIZE = 8                # itens esperando entre uma etapa e a próxima
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a", ".flac", ".ogg", ".webm")
+
+_STOP = object()              # marca o fim da fila para os workers
+
+
+# ============================================
+# ETAPA
+# ============================================
+class Stage:
+    """
+    Uma etapa do pipeline com seus próprios workers.
+    kind="thread" para I/O (ffmpeg, API, Firebase) e kind="process" para CPU (NumPy).
+    A função recebe um item (dict) e devolve o item atualizado, ou None para descartá-lo.
+    on_drop(item) é chamado quando o item sai do pipeline por falha ou descarte.
+    """
+
+    def __init__(self, name, func, workers=1, kind="thread", queue_size=QUEUE_SIZE):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.kind = kind
+        self.input = queue.Queue(maxsize=queue_size)
+        self.output = None
+        self.on_drop = None
+        self.executor = None
+        self.threads = []
+
+        self.lock = threading.Lock()
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.max_queue = 0
+        self.started_at = None
+        self.finished_at = None
+
+    def start(self):
+        self.started_at = time.time()
+        if self.kind == "process":
+            # Cada thread despacha um item por vez para o pool, então nunca há
+            # mais itens em voo do que processos e a fila limitada segura o resto.
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"{self.name}-{i + 1}", daemon=True)
+            t.start()
+            self.threads.append(t)
+
+    def _run(self, item):
+        if self.executor is not None:
+            return self.executor.submit(self.func, item).result()
+        return self.func(item)
+
+    def _worker(self):
+        while True:
+            self.max_queue = max(self.max_queue, self.input.qsize())
+            item = self.input.get()
+            if item is _STOP:
+                break
+
+            started = time.time()
+            try:
+                result = self._run(item)
+            except Exception as e:
+                result = None
+                item["erro"] = f"{self.name}: {e}"
+                print(f"❌ [{self.name}] {item.get('arquivo')}: {e}")
+                with self.lock:
+                    self.failed += 1
+            else:
+                with self.lock:
+                    self.processed += 1
+            finally:
+                with self.lock:
+                    self.busy_seconds += time.time() - started
+
+            if result is None:
+                if self.on_drop is not None:
+                    self.on_drop(item)
+            elif self.output is not None:
+                self.output.put(result)
+
+    def join(self):
+        for t in self.threads:
+            t.join()
+        if self.executor is not None:
+            self.executor.shutdown()
+        self.finished_at = time.time()
+
+    def stats(self):
+        elapsed = (self.finished_at or time.time()) - (self.started_at or time.time())
+        utilization = self.busy_seconds / (elapsed * self.workers) if elapsed > 0 else 0.0
+        return {
+            "etapa": self.name,
+            "tipo": self.kind,
+            "workers": self.workers,
+            "processados": self.processed,
+            "falhas": self.failed,
+            "ocupacao": utilization,
+            "fila_max": self.max_queue,
+        }
+
+
+# ============================================
+# PIPELINE
+# ============================================
+class Pipeline:
+    """
+    Encadeia as etapas com filas limitadas entre elas.
+    cleanup(item) roda uma vez no fim da vida de cada item: ao ser descartado
+    em qualquer etapa ou ao sair da última.
+    """
+
+    def __init__(self, stages, cleanup=None):
+        self.stages = stages
+        self.cleanup = cleanup
+        self.results = []
+        self._results_lock = threading.Lock()
+        for current, following in zip(stages, stages[1:]):
+            current.output = following.input
+        stages[-1].output = self
+        for stage in stages:
+            stage.on_drop = self._release
+
+    def _release(self, item):
+        if self.cleanup is None:
+            return
+        try:
+            self.cleanup(item)
+        except Exception as e:
+            print(f"⚠️ Erro ao limpar {item.get('arquivo')}: {e}")
+
+    def put(self, item):
+        # A última etapa entrega aqui
+        self._release(item)
+        with self._results_lock:
+            self.results.append(item)
+
+    def run(self, items):
+        for stage in self.stages:
+            stage.start()
+
+        # put() bloqueia quando a primeira fila enche: é o controle de vazão
+        for item in items:
+            self.stages[0].input.put(item)
+
+        # Encerra etapa por etapa, só depois que a anterior esvaziou
+        for stage in self.stages:
+            for _ in range(stage.workers):
+                stage.input.put(_STOP)
+            stage.join()
+        return self.results
+
+    def report(self):
+        print("\n📈 Ocupação por etapa:")
+        for s in (stage.stats() for stage in self.stages):
+            print(f"   {s['etapa']:<12} {s['tipo']:<8} x{s['workers']} | "
+                  f"{s['processados']} ok, {s['falhas']} falha(s) | "
+                  f"ocupação {s['ocupacao']:.0%} | fila máx {s['fila_max']}")
+
+
+# ============================================
+# ETAPAS DA TRANSCRIÇÃO
+# ============================================
+# O app (Speech API/Firebase) só é importado nas etapas em thread, assim os
+# processos da etapa de CPU não precisam carregar essas bibliotecas.
+def stage_prepare(item):
+    """I/O: valida e converte com ffmpeg se necessário (o arquivamento espera a triagem)"""
+    from app import prepare_audio
+
+    path, error = prepare_audio(item["arquivo"])
+    if error:
+        raise ValueError(error)
+    # A partir daqui o item carrega um temporário: remove_converted apaga no fim
+    item["wav"] = path
+    return item
+
+
+def stage_analyze(item):
+    """CPU: triagem de qualidade e normalização (roda em outro processo)"""
+    audio_content, stats, error = prescreen_audio(item["wav"])
+    if error:
+        raise ValueError(f"Áudio rejeitado: {error}")
+    item["audio"] = audio_content
+    item["qualidade"] = stats
+    return item
+
+
+def stage_recognize(item):
+    """I/O: arquiva o áudio aprovado na triagem, envia para a Speech API e monta o texto por locutor"""
+    from app import recognize_audio
+
+    audio_hash = None
+    try:
+        audio_hash = archive_audio(item["wav"], source_path=item["arquivo"])
+    except Exception as e:
+        print(f"⚠️ Erro ao arquivar {item['arquivo']}: {e}")
+    item["hash"] = audio_hash
+
+    text, error = recognize_audio(item.pop("audio"), item["arquivo"], audio_hash)
+    if error:
+        raise ValueError(error)
+    item["texto"] = text
+    return item
+
+
+def remove_converted(item):
+    """O _converted.wav é temporário: a cópia que fica é a do arquivo"""
+    path = item.get("wav")
+    if path and path != item["arquivo"] and os.path.exists(path):
+        os.remove(path)
+
+
+def build_transcription_pipeline(db=None, prepare_workers=2, analyze_workers=None, recognize_workers=4):
+    stages = [
+        Stage("preparar", stage_prepare, workers=prepare_workers),
+        Stage("analisar", stage_analyze, workers=analyze_workers or os.cpu_count() or 1, kind="process"),
+        Stage("transcrever", stage_recognize, workers=recognize_workers),
+    ]
+
+    if db is not None:
+        from app import CONVERSATION_ID
+        from historico_conversas import append_segment
+
+        def stage_save(item):
+            """I/O: acrescenta o trecho ao histórico no Firestore"""
+            append_segment(db, CONVERSATION_ID, item["texto"])
+            return item
+
+        stages.append(Stage("salvar", stage_save, workers=2))
+
+    return Pipeline(stages, cleanup=remove_converted)
+
+
+def main(paths):
+    if not paths:
+        paths = [
+            os.path.join(AUDIO_FOLDER, name) for name in sorted(os.listdir(AUDIO_FOLDER))
+            if name.lower().endswith(AUDIO_EXTENSIONS) and "_converted" not in name
+        ]
+    print(f"🎯 {len(paths)} arquivo(s) na fila")
+
+    pipeline = build_transcription_pipeline()
+    started = time.time()
+    results = pipeline.run({"arquivo": path} for path in paths)
+
+    print(f"\n✅ {len(results)}/{len(paths)} transcrito(s) em {time.time() - started:.1f}s")
+    for item in results:
+        print(f"\n📄 {item['arquivo']}:\n{item['texto']}")
+    pipeline.report()
+
+
+if __name__ == "__main__":
+    # python pipeline_paralelo.py [arquivo1.wav arquivo2.wav ...]
+    main(sys.argv[1:])
@@ -0,0 +1,486 @@
+import io
+import os
+import sys
+import glob
+import time
+import wave
+import copy
+import random
+import shutil
+import tempfile
+import operator
+import functools
+import threading
+import tracemalloc
+import contextlib
+from types import SimpleNamespace
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from google.api_core import exceptions as google_exceptions
+
+import app
+import captura_multi_serial
+import historico_conversas
+from identificar_locutores import synthetic_speech
+
+# ============================================
+# CONFIGURAÇÕES
+# ============================================
+LEVELS = [1, 2, 4, 8, 16, 32]     # clientes simultâneos em cada degrau da rampa
+REQUESTS_PER_CLIENT = 3
+SYNTHETIC_SAMPLES = 3             # áudios sintéticos gerados além dos WAVs do projeto
+SAMPLE_RATE = 16000
+
+# Speech API falsa
+SPEECH_LATENCY = (0.5, 1.5)       # segundos (mín, máx)
+SPEECH_CAPACITY = 8               # requisições atendidas ao mesmo tempo (cota)
+SPEECH_ERROR_RATE = 0.02
+
+# Firestore falso
+FIRESTORE_LATENCY = (0.02, 0.10)
+FIRESTORE_ERROR_RATE = 0.01
+
+# Saturação: a vazão parou de crescer ou os erros passaram do limite
+MIN_THROUGHPUT_GAIN = 1.10
+MAX_ERROR_RATE = 0.05
+
+# Placas ESP32 simuladas
+SERIAL_DEVICES = 4
+SERIAL_SECONDS = 30               # duração da simulação (tempo real)
+SERIAL_SPEEDUP = 10               # o áudio chega N vezes mais rápido que o real
+SERIAL_DISCONNECT_RATE = 0.001    # chance de "desconectar" a cada leitura
+
+BUNDLED_WAVS = ["audios/*.wav", "assets/fonts/*.wav"]
+
+
+# ============================================
+# SERVIÇOS FALSOS
+# ============================================
+class FakeSpeechClient:
+    """Imita o SpeechClient v2: latência, cota de concorrência e erros injetados"""
+
+    capacity = threading.Semaphore(SPEECH_CAPACITY)
+
+    def __init__(self, client_options=None):
+        pass
+
+    def recognize(self, request):
+        with FakeSpeechClient.capacity:
+            time.sleep(random.uniform(*SPEECH_LATENCY))
+            if random.random() < SPEECH_ERROR_RATE:
+                raise google_exceptions.ServiceUnavailable("erro injetado pelo teste de carga")
+
+        with wave.open(io.BytesIO(request.content), 'rb') as wf:
+            duration = wf.getnframes() / wf.getframerate()
+        return SimpleNamespace(results=[_fake_result(duration)])
+
+
+def _fake_result(duration):
+    words = []
+    t = 0.0
+    while t + 0.4 <= duration:
+        speaker = str(1 + (len(words) // 5) % 2)  # troca de locutor a cada 5 palavras
+        words.append(SimpleNamespace(
+            word=f"palavra{len(words) + 1}",
+            start_offset=timedelta(seconds=t),
+            end_offset=timedelta(seconds=t + 0.35),
+            speaker_label=speaker,
+        ))
+        t += 0.4
+    transcript = " ".join(w.word for w in words)
+    return SimpleNamespace(alternatives=[SimpleNamespace(transcript=transcript, confidence=0.9, words=words)])
+
+
+SERVER_TIMESTAMP = object()       # marcador trocado pelo horário na gravação, como no Firestore
+
+_OPERATORS = {
+    "<": operator.lt, "<=": operator.le, "==": operator.eq,
+    ">": operator.gt, ">=": operator.ge,
+}
+
+
+class FakeFirestore:
+    """
+    Imita o Firestore usado pelo app e pelo historico_conversas.py: documentos,
+    subcoleções, consultas simples e transações, com latência e erros injetados.
+    As transações são serializadas, como a disputa real pelo documento de estado.
+    """
+
+    def __init__(self):
+        self.documents = {}           # caminho (coleção, doc, subcoleção, doc...) -> dados
+        self.writes = 0
+        self.lock = threading.Lock()
+        self.transaction_lock = threading.Lock()
+
+    def collection(self, name):
+        return FakeQuery(self, (name,))
+
+    def transaction(self):
+        return FakeTransaction(self)
+
+    def count(self, collection_name):
+        with self.lock:
+            return sum(1 for path in self.documents if path[-2] == collection_name)
+
+    def _call(self):
+        time.sleep(random.uniform(*FIRESTORE_LATENCY))
+        if random.random() < FIRESTORE_ERROR_RATE:
+            raise google_exceptions.ServiceUnavailable("erro injetado pelo teste de carga")
+
+    def _apply(self, writes):
+        """Aplica as gravações de uma vez (tudo ou nada), como um commit"""
+        with self.lock:
+            for kind, path, _, _ in writes:
+                if kind == "create" and path in self.documents:
+                    raise google_exceptions.AlreadyExists(f"documento já existe: {'/'.join(path)}")
+            for kind, path, data, merge in writes:
+                if kind == "delete":
+                    self.documents.pop(path, None)
+                    continue
+                data = {k: (datetime.now() if v is SERVER_TIMESTAMP else v) for k, v in data.items()}
+                if merge:
+                    self.documents.setdefault(path, {}).update(data)
+                else:
+                    self.documents[path] = data
+                self.writes += 1
+
+
+class FakeDocument:
+    def __init__(self, db, path):
+        self.db = db
+        self.path = path
+        self.id = path[-1]
+
+    def collection(self, name):
+        return FakeQuery(self.db, self.path + (name,))
+
+    def get(self, transaction=None):
+        self.db._call()
+        with self.db.lock:
+            data = self.db.documents.get(self.path)
+        return FakeSnapshot(self, None if data is None else dict(data))
+
+    def set(self, data, merge=False):
+        self.db._call()
+        self.db._apply([("set", self.path, data, merge)])
+
+    def delete(self):
+        self.db._call()
+        self.db._apply([("delete", self.path, None, False)])
+
+
+class FakeSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return self._data
+
+
+class FakeQuery:
+    """Coleção e consulta: where, order_by, start_after e limit"""
+
+    def __init__(self, db, path):
+        self.db = db
+        self.path = path
+        self.filters = []
+        self.order = None
+        self.after = None
+        self.max_results = None
+
+    def _copy(self):
+        query = copy.copy(self)
+        query.filters = list(self.filters)
+        return query
+
+    def document(self, doc_id):
+        return FakeDocument(self.db, self.path + (str(doc_id),))
+
+    def where(self, field, op, value):
+        query = self._copy()
+        query.filters.append((field, _OPERATORS[op], value))
+        return query
+
+    def order_by(self, field, direction="ASCENDING"):
+        query = self._copy()
+        query.order = (field, direction == "DESCENDING")
+        return query
+
+    def start_after(self, values):
+        query = self._copy()
+        query.after = values[query.order[0]]
+        return query
+
+    def limit(self, count):
+        query = self._copy()
+        query.max_results = count
+        return query
+
+    def select(self, fields):
+        return self
+
+    def stream(self, transaction=None):
+        self.db._call()
+        with self.db.lock:
+            docs = [(path, dict(data)) for path, data in self.db.documents.items() if path[:-1] == self.path]
+        docs = [(p, d) for p, d in docs if all(f in d and op(d[f], v) for f, op, v in self.filters)]
+        if self.order:
+            field, descending = self.order
+            docs.sort(key=lambda item: item[1][field], reverse=descending)
+            if self.after is not None:
+                beyond = operator.lt if descending else operator.gt
+                docs = [(p, d) for p, d in docs if beyond(d[field], self.after)]
+        if self.max_results is not None:
+            docs = docs[:self.max_results]
+        return [FakeSnapshot(FakeDocument(self.db, p), d) for p, d in docs]
+
+
+class FakeTransaction:
+    """Junta as gravações e aplica tudo no commit"""
+
+    def __init__(self, db):
+        self.db = db
+        self.writes = []
+
+    def create(self, reference, data):
+        self.writes.append(("create", reference.path, data, False))
+
+    def set(self, reference, data, merge=False):
+        self.writes.append(("set", reference.path, data, merge))
+
+    def delete(self, reference):
+        self.writes.append(("delete", reference.path, None, False))
+
+    def commit(self):
+        self.db._call()
+        self.db._apply(self.writes)
+
+
+def fake_transactional(func):
+    """Substitui firestore.transactional: roda a função e faz o commit, uma transação por vez"""
+    @functools.wraps(func)
+    def wrapper(transaction, *args, **kwargs):
+        with transaction.db.transaction_lock:
+            transaction.writes = []
+            result = func(transaction, *args, **kwargs)
+            transaction.commit()
+        return result
+    return wrapper
+
+
+# Entra no lugar do módulo firestore dentro do historico_conversas.py
+fake_firestore_module = SimpleNamespace(
+    transactional=fake_transactional,
+    SERVER_TIMESTAMP=SERVER_TIMESTAMP,
+    Query=SimpleNamespace(ASCENDING="ASCENDING", DESCENDING="DESCENDING"),
+)
+
+
+class FakeSerial:
+    """Imita serial.Serial tocando um WAV em loop, no ritmo de uma placa ESP32"""
+
+    def __init__(self, port, baudrate, timeout=1):
+        self.port = port
+        self.pcm = SERIAL_SOURCES[hash(port) % len(SERIAL_SOURCES)]
+        self.position = 0
+
+    def reset_input_buffer(self):
+        pass
+
+    def read(self, size):
+        time.sleep(size / (SAMPLE_RATE * 2) / SERIAL_SPEEDUP)
+        if random.random() < SERIAL_DISCONNECT_RATE:
+            raise OSError("placa desconectada (simulado)")
+        chunk = self.pcm[self.position:self.position + size]
+        self.position = (self.position + size) % len(self.pcm)
+        return chunk
+
+    def close(self):
+        pass
+
+
+SERIAL_SOURCES = []
+
+
+# ============================================
+# ÁUDIOS DE TESTE
+# ============================================
+def wav_bytes(samples):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+def load_samples():
+    samples = []
+    for pattern in BUNDLED_WAVS:
+        for path in sorted(glob.glob(pattern)):
+            with open(path, "rb") as f:
+                samples.append((os.path.basename(path), f.read()))
+    for i in range(SYNTHETIC_SAMPLES):
+        samples.append((f"sintetico{i + 1}.wav", wav_bytes(synthetic_speech(random.uniform(5, 20), i))))
+    return samples
+
+
+# ============================================
+# CENÁRIO WEB (/save_audio + /transcribe do templates/index.html)
+# ============================================
+def web_client(client_id, samples, db, upload_folder):
+    """Um navegador: salva o áudio gravado e pede a transcrição, várias vezes"""
+    latencies = []
+    errors = 0
+    for n in range(REQUESTS_PER_CLIENT):
+        name, content = random.choice(samples)
+        started = time.perf_counter()
+        try:
+            # /save_audio
+            path = os.path.join(upload_folder, f"cliente{client_id}_{n}_{name}")
+            with open(path, "wb") as f:
+                f.write(content)
+            # /transcribe (mesmas gravações do app.main: texto + histórico transacional)
+            text, error = app.transcribe_with_diarization(path)
+            if error or not app.save_to_firebase(db, text):
+                errors += 1
+                continue
+            historico_conversas.append_segment(db, app.CONVERSATION_ID, text)
+        except Exception:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    return latencies, errors
+
+
+def run_level(clients, samples, upload_folder):
+    db = FakeFirestore()
+    tracemalloc.reset_peak()
+    memory_before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        futures = [pool.submit(web_client, i, samples, db, upload_folder) for i in range(clients)]
+        outcomes = [f.result() for f in futures]
+
+    elapsed = time.perf_counter() - started
+    memory_after, memory_peak = tracemalloc.get_traced_memory()
+    latencies = sorted(l for lats, _ in outcomes for l in lats)
+    errors = sum(e for _, e in outcomes)
+    total = clients * REQUESTS_PER_CLIENT
+
+    def percentile(p):
+        return float(np.percentile(latencies, p)) if latencies else float("nan")
+
+    return {
+        "clientes": clients,
+        "requisicoes": total,
+        "erros": errors,
+        "taxa_erro": errors / total,
+        "vazao": len(latencies) / elapsed,
+        "p50": percentile(50),
+        "p95": percentile(95),
+        "p99": percentile(99),
+        "memoria_mb": (memory_after - memory_before) / 2**20,
+        "pico_mb": (memory_peak - memory_before) / 2**20,
+    }
+
+
+def run_web_scenario(samples, upload_folder):
+    print("\n🌐 Rampa de clientes web (/save_audio → /transcribe)")
+    print(f"{'clientes':>8} {'req':>5} {'erros':>6} {'req/s':>7} {'p50':>7} {'p95':>7} {'p99':>7} {'mem MB':>8} {'pico MB':>8}")
+
+    results = []
+    saturation = None
+    best_throughput = 0.0
+    for clients in LEVELS:
+        with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+            r = run_level(clients, samples, upload_folder)
+        results.append(r)
+        print(f"{r['clientes']:>8} {r['requisicoes']:>5} {r['erros']:>6} {r['vazao']:>7.2f} "
+              f"{r['p50']:>6.2f}s {r['p95']:>6.2f}s {r['p99']:>6.2f}s {r['memoria_mb']:>8.1f} {r['pico_mb']:>8.1f}")
+
+        if saturation is None and results[:-1] and (
+                r["vazao"] < best_throughput * MIN_THROUGHPUT_GAIN or r["taxa_erro"] > MAX_ERROR_RATE):
+            saturation = results[-2]
+        best_throughput = max(best_throughput, r["vazao"])
+
+    if saturation:
+        print(f"\n📉 Saturação em ~{saturation['clientes']} cliente(s) simultâneo(s) "
+              f"({saturation['vazao']:.2f} req/s, p95 {saturation['p95']:.2f}s)")
+    else:
+        print(f"\n📈 Sem saturação até {LEVELS[-1]} clientes")
+    return results, saturation
+
+
+# ============================================
+# CENÁRIO SERIAL (gravar_serial_wav.py / captura_multi_serial.py)
+# ============================================
+def run_serial_scenario(samples, output_folder):
+    print(f"\n🔌 {SERIAL_DEVICES} placa(s) simulada(s) por {SERIAL_SECONDS}s (x{SERIAL_SPEEDUP} tempo real)")
+    for _, content in samples:
+        with wave.open(io.BytesIO(content), 'rb') as wf:
+            if wf.getframerate() == SAMPLE_RATE and wf.getnchannels() == 1:
+                SERIAL_SOURCES.append(wf.readframes(wf.getnframes()))
+
+    latencies = []
+    lock = threading.Lock()
+    db = FakeFirestore()
+
+    def on_segment(device_id, session_id, path):
+        started = time.perf_counter()
+        captura_multi_serial.transcribe_segment(device_id, session_id, path, db=db)
+        with lock:
+            latencies.append(time.perf_counter() - started)
+
+    captura_multi_serial.serial = SimpleNamespace(Serial=FakeSerial)
+    captura_multi_serial.OUTPUT_FOLDER = output_folder
+    hub = captura_multi_serial.CaptureHub(on_segment)
+
+    with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+        for i in range(SERIAL_DEVICES):
+            hub.add_port(f"SIM{i + 1}")
+        time.sleep(SERIAL_SECONDS)
+        hub.stop()
+
+    for s in hub.stats():
+        print(f"   {s['device_id']}: {s['segments']} trecho(s) | descartados {s['dropped_chunks']} bloco(s)/{s['dropped_segments']} trecho(s) | erros {s['errors']}")
+    if latencies:
+        print(f"   transcrição por trecho: p50 {np.percentile(latencies, 50):.2f}s | p95 {np.percentile(latencies, 95):.2f}s")
+    print(f"   histórico: {db.count(historico_conversas.SEGMENTS_COLLECTION)} trecho(s) aberto(s), "
+          f"{db.count(historico_conversas.PAGES_COLLECTION)} página(s) arquivada(s)")
+    return hub.stats()
+
+
+def main():
+    samples = load_samples()
+    print(f"🎧 {len(samples)} áudio(s) de teste")
+
+    # Os artefatos (uploads, transcricoes/, logs/, locutores/) ficam numa pasta temporária
+    workdir = tempfile.mkdtemp(prefix="carga_")
+    os.chdir(workdir)
+    os.makedirs("uploads")
+    os.makedirs("serial")
+
+    app.SpeechClient = FakeSpeechClient
+    historico_conversas.firestore = fake_firestore_module
+    tracemalloc.start()
+    try:
+        run_web_scenario(samples, "uploads")
+        if "--sem-serial" not in sys.argv:
+            run_serial_scenario(samples, "serial")
+    finally:
+        tracemalloc.stop()
+        os.chdir(os.path.dirname(os.path.abspath(__file__)))
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    # python teste_carga.py [--sem-serial]
+    main()
@@ -1,6 +1,7 @@
 import os
 import io
 import re
+import tempfile
 from google.cloud import speech_v1p1beta1 as speech
 from pydub import AudioSegment
 
@@ -15,7 +16,9 @@ def converter_para_wav(caminho):
     audio = audio.set_frame_rate(16000)
     audio = audio.set_channels(1)
     audio = audio.set_sample_width(2)
-    novo = caminho.rsplit(".", 1)[0] + ".wav"
+    # grava num temporário: não sobrescreve o original nem deixa cópias em audios/
+    fd, novo = tempfile.mkstemp(suffix=".wav")
+    os.close(fd)
     audio.export(novo, format="wav")
     return novo
 
@@ -181,8 +184,11 @@ if __name__ == "__main__":
             caminho = os.path.join(PASTA, arquivo)
             print(f"\n🎙 Preparando: {arquivo} ...")
             wav = converter_para_wav(caminho)
-            print(f"🎧 Transcrevendo: {os.path.basename(wav)} ...")
-            texto = transcrever_e_alinhar(wav)
+            print(f"🎧 Transcrevendo: {arquivo} ...")
+            try:
+                texto = transcrever_e_alinhar(wav)
+            finally:
+                os.remove(wav)
             print("\n======= RESULTADO =======")
             print(texto)
             print("=========================\n")
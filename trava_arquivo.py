@@ -0,0 +1,77 @@
+import os
+import time
+import uuid
+import threading
+import contextlib
+
+# ============================================
+# CONFIGURAÇÕES
+# ============================================
+# Trava entre processos (ex.: captura_multi_serial.py e app.py rodando juntos)
+# usando um arquivo .lock criado com O_EXCL. Enquanto a trava está com alguém,
+# uma thread renova o horário do arquivo; só uma trava sem renovação há mais de
+# LOCK_STALE_SECONDS é considerada abandonada por um processo que caiu.
+LOCK_STALE_SECONDS = 30
+LOCK_REFRESH_SECONDS = LOCK_STALE_SECONDS / 3
+LOCK_POLL_SECONDS = 0.05
+
+
+def _read_owner(lock_path):
+    try:
+        with open(lock_path, encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _try_acquire(lock_path, token):
+    try:
+        fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token)
+    return True
+
+
+def _remove_if_stale(lock_path):
+    try:
+        if time.time() - os.path.getmtime(lock_path) > LOCK_STALE_SECONDS:
+            print(f"⚠️ Trava abandonada removida: {lock_path}")
+            os.remove(lock_path)
+    except FileNotFoundError:
+        pass
+
+
+def _refresh_loop(lock_path, token, stop_event):
+    while not stop_event.wait(LOCK_REFRESH_SECONDS):
+        if _read_owner(lock_path) != token:
+            return
+        try:
+            os.utime(lock_path)
+        except OSError:
+            return
+
+
+@contextlib.contextmanager
+def file_lock(lock_path):
+    """
+    Segura <lock_path> enquanto o bloco roda (vale entre threads e entre processos).
+    Na saída só apaga o arquivo se ele ainda for desta trava.
+    """
+    os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+    token = f"{os.getpid()}-{uuid.uuid4().hex}"
+    while not _try_acquire(lock_path, token):
+        _remove_if_stale(lock_path)
+        time.sleep(LOCK_POLL_SECONDS)
+
+    stop_event = threading.Event()
+    refresher = threading.Thread(target=_refresh_loop, args=(lock_path, token, stop_event), daemon=True)
+    refresher.start()
+    try:
+        yield
+    finally:
+        stop_event.set()
+        refresher.join()
+        if _read_owner(lock_path) == token:
+            os.remove(lock_path)